@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from django.conf import settings
+from .ml_fraud_model import predict_fraud_rows
+from .timing import collect
+
+logger = logging.getLogger(__name__)
+
+_Request = namedtuple('_Request', ['features', 'explain', 'future'])
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-transaction predictions into one matrix.
+
+    A background thread takes the first waiting request, keeps collecting
+    until max_batch_size rows are queued or max_latency_us microseconds have
+    passed since that first request, scores everything with one
+    predict_fraud_rows() call and resolves each caller's Future.
+    max_latency_us=0 never waits: it scores whatever is already queued.
+    """
+
+    def __init__(self, max_batch_size=64, max_latency_us=500, score_rows=predict_fraud_rows):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_us / 1e6
+        self._score_rows = score_rows
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._size_histogram = {}
+
+    def submit(self, features_dict, explain=True):
+        """Queue one transaction and return a Future for its prediction"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put(_Request(features_dict, explain, future))
+        return future
+
+    def predict(self, features_dict, explain=True):
+        """Blocking predict_fraud() equivalent that goes through the batcher"""
+        return self.submit(features_dict, explain).result()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='fraud-micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._record(len(batch))
+            try:
+                with collect('micro_batcher'):
+                    results = self._score_rows(
+                        [request.features for request in batch],
+                        explain=any(request.explain for request in batch)
+                    )
+            except BaseException as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            for request, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    request.future.set_exception(result)
+                    continue
+                if not request.explain:
+                    result.pop('top_contributing_features', None)
+                request.future.set_result(result)
+
+    def _record(self, size):
+        # Power-of-two buckets: 1, 2, 4, 8, ... (each counts sizes up to its value)
+        bucket = 1 << (size - 1).bit_length()
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._size_histogram[bucket] = self._size_histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        """Achieved batch sizes since startup"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_latency_us': round(self.max_latency * 1e6),
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_size_histogram': {
+                    f'<={bucket}': count for bucket, count in sorted(self._size_histogram.items())
+                },
+            }
+
+_micro_batcher = None
+_micro_batcher_lock = threading.Lock()
+
+def get_micro_batcher():
+    """Process-wide MicroBatcher configured from FRAUD_MICROBATCH_* settings"""
+    global _micro_batcher
+    if _micro_batcher is None:
+        with _micro_batcher_lock:
+            if _micro_batcher is None:
+                _micro_batcher = MicroBatcher(
+                    max_batch_size=settings.FRAUD_MICROBATCH_MAX_SIZE,
+                    max_latency_us=settings.FRAUD_MICROBATCH_MAX_LATENCY_US
+                )
+    return _micro_batcher
@@ -0,0 +1,122 @@
+"""
+Versioned response caching with ETags for the read endpoints.
+
+Cache keys and ETags are derived from a version token plus the request
+path, never from the data itself. Transaction writes replace the
+transactions token once they commit, and a model swap changes the artifact
+signature, so a repeat request costs one cache lookup: a 304 if the
+client's If-None-Match still matches, otherwise the cached body. Entries
+for old versions are never read again and expire after
+FRAUD_RESPONSE_CACHE_TIMEOUT seconds.
+
+With more than one worker process, point CACHES at a shared backend
+(Redis, Memcached) so every worker sees the same versions.
+"""
+import hashlib
+import secrets
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import parse_etags
+
+TRANSACTIONS_VERSION_KEY = 'fraud:transactions:version'
+
+def _new_token():
+    return secrets.token_hex(8)
+
+async def atransactions_version():
+    """Current transactions version token"""
+    version = await cache.aget(TRANSACTIONS_VERSION_KEY)
+    if version is None:
+        # First use, or the key was evicted: any fresh token invalidates what was cached before
+        version = _new_token()
+        if not await cache.aadd(TRANSACTIONS_VERSION_KEY, version, timeout=None):
+            version = await cache.aget(TRANSACTIONS_VERSION_KEY, version)
+    return version
+
+def bump_transactions_version():
+    cache.set(TRANSACTIONS_VERSION_KEY, _new_token(), timeout=None)
+
+def invalidate_transactions():
+    """Invalidate cached transaction reads once the current database transaction commits"""
+    db_transaction.on_commit(bump_transactions_version)
+
+def response_etag(request, version):
+    """Strong ETag for this path and query string at the given data version"""
+    digest = hashlib.sha256(f'{request.get_full_path()}\n{version}'.encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _not_modified(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison
+    etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+    return '*' in etags or etag in etags
+
+def _cached_response(body, etag):
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Clients may keep the body but have to revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _not_modified_response(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+def cached_json_response(request, version, build):
+    """
+    Serve build()'s JSON response through the cache at the given version.
+
+    Only 200 responses are cached; anything else is returned as built.
+    """
+    etag = response_etag(request, version)
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    key = f'fraud:response:{etag}'
+    body = cache.get(key)
+    if body is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        body = response.content
+        cache.set(key, body, settings.FRAUD_RESPONSE_CACHE_TIMEOUT)
+    return _cached_response(body, etag)
+
+async def acached_json_response(request, version, build):
+    """
+    cached_json_response() for async views; build is a coroutine function.
+
+    Streamed responses are passed through and cached after the last chunk.
+    """
+    etag = response_etag(request, version)
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    key = f'fraud:response:{etag}'
+    body = await cache.aget(key)
+    if body is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+        if response.streaming:
+            return _tee_streaming_response(response, key, etag)
+        body = response.content
+        await cache.aset(key, body, settings.FRAUD_RESPONSE_CACHE_TIMEOUT)
+    return _cached_response(body, etag)
+
+def _tee_streaming_response(response, key, etag):
+    """Pass a streamed body through to the client and cache it once it is complete"""
+    async def tee():
+        parts = []
+        async for part in response.streaming_content:
+            parts.append(part)
+            yield part
+        await cache.aset(key, b''.join(parts), settings.FRAUD_RESPONSE_CACHE_TIMEOUT)
+    
+    streamed = StreamingHttpResponse(tee(), content_type=response['Content-Type'])
+    streamed['ETag'] = etag
+    streamed['Cache-Control'] = 'private, no-cache'
+    return streamed
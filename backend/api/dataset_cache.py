@@ -0,0 +1,183 @@
+"""
+Binary columnar cache of the training CSV.
+
+The CSV is parsed once into one raw little-endian file per column, stored
+under a directory named after the source file's SHA-256. A JSON manifest
+records the source size, mtime and hash plus the column dtypes, so later
+opens are a stat() and a few np.memmap calls instead of a CSV parse.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILENAME = 'manifest.json'
+CSV_CHUNKSIZE = 100000
+TARGET_COLUMN = 'Class'
+
+def default_cache_dir(data_path):
+    """data/creditcard.csv is cached in data/cache/creditcard/"""
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(os.path.dirname(data_path), 'cache', stem)
+
+def _file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json_atomic(data, path):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+class CachedDataset:
+    """Read-only, memory-mapped view of a cached dataset"""
+
+    def __init__(self, cache_dir, manifest):
+        self.cache_dir = cache_dir
+        self.manifest = manifest
+        self.rows = manifest['rows']
+        self.columns = [column['name'] for column in manifest['columns']]
+        self._dtypes = {column['name']: np.dtype(column['dtype']) for column in manifest['columns']}
+        self._files = {
+            column['name']: os.path.join(cache_dir, manifest['version'], column['file'])
+            for column in manifest['columns']
+        }
+        self._arrays = {}
+
+    def __getitem__(self, column):
+        """Memory-mapped array for one column, without copying it into memory"""
+        if column not in self._arrays:
+            if self.rows:
+                array = np.memmap(self._files[column], dtype=self._dtypes[column], mode='r', shape=(self.rows,))
+            else:
+                array = np.empty(0, dtype=self._dtypes[column])
+            self._arrays[column] = array
+        return self._arrays[column]
+
+    def __len__(self):
+        return self.rows
+
+    def to_frame(self, columns=None, start=0, stop=None):
+        """DataFrame over rows [start, stop) backed by the memory maps"""
+        return pd.DataFrame(
+            {column: self[column][start:stop] for column in (columns or self.columns)},
+            copy=False
+        )
+
+    def iter_chunks(self, chunksize, columns=None):
+        """Yield consecutive DataFrames of at most chunksize rows"""
+        for start in range(0, self.rows, chunksize):
+            yield self.to_frame(columns, start, start + chunksize)
+
+def _csv_dtypes(data_path):
+    columns = pd.read_csv(data_path, nrows=0).columns
+    dtypes = {column: np.float32 for column in columns}
+    if TARGET_COLUMN in dtypes:
+        dtypes[TARGET_COLUMN] = np.int8
+    return dtypes
+
+def build_dataset_cache(data_path, cache_dir=None, chunksize=CSV_CHUNKSIZE):
+    """Convert data_path into the columnar cache and return the new manifest"""
+    cache_dir = cache_dir or default_cache_dir(data_path)
+    stat = os.stat(data_path)
+    sha256 = _file_sha256(data_path)
+    version = sha256[:16]
+    version_dir = os.path.join(cache_dir, version)
+
+    dtypes = _csv_dtypes(data_path)
+    columns = [
+        {'name': name, 'dtype': np.dtype(dtype).str, 'file': f'{index:03d}.bin'}
+        for index, (name, dtype) in enumerate(dtypes.items())
+    ]
+
+    if not os.path.isdir(version_dir):
+        print(f"Building dataset cache for {data_path}...")
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_dir = f'{version_dir}.tmp-{os.getpid()}'
+        os.makedirs(tmp_dir, exist_ok=True)
+        rows = 0
+        try:
+            files = [open(os.path.join(tmp_dir, column['file']), 'wb') for column in columns]
+            try:
+                for chunk in pd.read_csv(data_path, chunksize=chunksize, dtype=dtypes):
+                    for f, column in zip(files, columns):
+                        chunk[column['name']].to_numpy(dtype=column['dtype']).tofile(f)
+                    rows += len(chunk)
+            finally:
+                for f in files:
+                    f.close()
+            _write_json_atomic({'rows': rows}, os.path.join(tmp_dir, 'rows.json'))
+            try:
+                os.replace(tmp_dir, version_dir)
+            except OSError:
+                # Another process finished the same version first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    with open(os.path.join(version_dir, 'rows.json')) as f:
+        rows = json.load(f)['rows']
+
+    manifest = {
+        'source': {
+            'path': os.path.abspath(data_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+        },
+        'version': version,
+        'rows': rows,
+        'columns': columns,
+    }
+    _write_json_atomic(manifest, os.path.join(cache_dir, MANIFEST_FILENAME))
+
+    # Drop versions built from older copies of the source file
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if entry != version and os.path.isdir(path) and '.tmp-' not in entry:
+            shutil.rmtree(path, ignore_errors=True)
+
+    return manifest
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILENAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def open_dataset(data_path, cache_dir=None):
+    """
+    Open the cached copy of data_path, (re)building it if the source changed.
+
+    A matching size and mtime is trusted as is; otherwise the source is
+    hashed and only re-parsed when its content actually differs.
+    """
+    cache_dir = cache_dir or default_cache_dir(data_path)
+    manifest = _read_manifest(cache_dir)
+    stat = os.stat(data_path)
+
+    if manifest is not None:
+        source = manifest['source']
+        version_dir = os.path.join(cache_dir, manifest['version'])
+        if not os.path.isdir(version_dir) or source['size'] != stat.st_size:
+            manifest = None
+        elif source['mtime_ns'] != stat.st_mtime_ns:
+            if _file_sha256(data_path) == source['sha256']:
+                # Touched (e.g. by a checkout) but unchanged: just record the new mtime
+                manifest['source']['mtime_ns'] = stat.st_mtime_ns
+                _write_json_atomic(manifest, os.path.join(cache_dir, MANIFEST_FILENAME))
+            else:
+                manifest = None
+
+    if manifest is None:
+        manifest = build_dataset_cache(data_path, cache_dir)
+
+    return CachedDataset(cache_dir, manifest)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+class _Subscriber:
+    def __init__(self, loop, max_queued):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.max_queued = max_queued
+
+class TransactionEventBroker:
+    """
+    In-process fan-out of transaction events to Server-Sent Events streams.
+
+    publish() may be called from any thread; each subscriber gets events on
+    its own event loop. The last buffer_size events are kept in a ring
+    buffer so a reconnecting client can resume after the last event id it
+    saw. If it fell further behind than that (or the ids come from an
+    earlier process) it gets a 'reset' event and should refetch the list.
+
+    Events only reach clients connected to the process that made the
+    change, so run a single ASGI worker or put a shared broker in front
+    when scaling out.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        # Start from the clock so ids keep increasing across restarts
+        self._last_id = int(time.time() * 1000)
+        self.published = 0
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, data)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, event)
+            except RuntimeError:  # The subscriber's loop is gone
+                self.unsubscribe(subscriber)
+        return event
+
+    def _deliver(self, subscriber, event):
+        if subscriber.queue.qsize() >= subscriber.max_queued:
+            # Too slow to keep up: end its stream, it resumes from the ring buffer on reconnect
+            self.unsubscribe(subscriber)
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+            return
+        subscriber.queue.put_nowait(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register the calling event loop; returns (subscriber, backlog).
+
+        backlog holds the buffered events after last_event_id, or a single
+        reset event when they are no longer all available.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop(), self._buffer.maxlen)
+        with self._lock:
+            backlog = []
+            if last_event_id is not None and last_event_id != self._last_id:
+                first_id = self._buffer[0].id if self._buffer else self._last_id + 1
+                if first_id - 1 <= last_event_id < self._last_id:
+                    backlog = [event for event in self._buffer if event.id > last_event_id]
+                else:
+                    backlog = [Event(self._last_id, 'reset', {})]
+            self._subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+def format_event(event):
+    """Serialize an Event in the text/event-stream wire format"""
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_event_broker():
+    """Process-wide TransactionEventBroker sized from FRAUD_EVENTS_BUFFER_SIZE"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = TransactionEventBroker(settings.FRAUD_EVENTS_BUFFER_SIZE)
+    return _broker
+
+def publish_transactions(event_type, transactions):
+    """
+    Publish one event per transaction, or a single 'batch_<event_type>'
+    event with the ids when a write holds more than
+    FRAUD_EVENTS_MAX_PER_WRITE, so one large batch can't overrun the ring
+    buffer and every subscriber's queue. Never lets a broker problem fail
+    the write.
+    """
+    try:
+        broker = get_event_broker()
+        if len(transactions) > settings.FRAUD_EVENTS_MAX_PER_WRITE:
+            ids = [transaction.id for transaction in transactions]
+            broker.publish(f'batch_{event_type}', {'count': len(ids), 'ids': ids})
+            return
+        for transaction in transactions:
+            broker.publish(event_type, transaction.as_dict())
+    except Exception:
+        logger.exception('Failed to publish %s events', event_type)
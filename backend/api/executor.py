@@ -0,0 +1,41 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_scoring_executor():
+    """
+    Bounded pool that runs model scoring off the event loop.
+
+    FRAUD_SCORING_POOL selects 'thread' (default; NumPy releases the GIL
+    inside the dot products) or 'process', FRAUD_SCORING_WORKERS its size.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                pool_class = ProcessPoolExecutor if settings.FRAUD_SCORING_POOL == 'process' else ThreadPoolExecutor
+                _executor = pool_class(max_workers=settings.FRAUD_SCORING_WORKERS)
+    return _executor
+
+def shutdown_scoring_executor(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+async def run_scoring(func, *args, **kwargs):
+    """Await func(*args, **kwargs) running in the scoring pool"""
+    loop = asyncio.get_running_loop()
+    executor = get_scoring_executor()
+    call = functools.partial(func, *args, **kwargs)
+    if isinstance(executor, ThreadPoolExecutor):
+        # Keep the request's context variables (e.g. its timing recorder) in the worker thread
+        call = functools.partial(contextvars.copy_context().run, call)
+    return await loop.run_in_executor(executor, call)
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from api.dataset_cache import build_dataset_cache, open_dataset
+from api.ml_fraud_model import DATA_PATH
+
+class Command(BaseCommand):
+    help = 'Converts the training CSV into the memory-mapped binary dataset cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-path', default=DATA_PATH)
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the cache is current')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['force']:
+            build_dataset_cache(options['data_path'])
+        dataset = open_dataset(options['data_path'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"Rows: {dataset.rows}")
+        self.stdout.write(f"Columns: {', '.join(dataset.columns)}")
+        self.stdout.write(self.style.SUCCESS(f'Dataset cache ready in {dataset.cache_dir} ({elapsed:.2f}s)'))
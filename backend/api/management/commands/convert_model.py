@@ -0,0 +1,18 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from api.ml_fraud_model import MODEL_DIR, artifact_paths
+from api.ml_training import convert_pickles
+
+class Command(BaseCommand):
+    help = 'Writes the consolidated .npy + JSON model artifact from existing joblib pickles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-dir', default=MODEL_DIR)
+
+    def handle(self, *args, **options):
+        model_dir = options['model_dir']
+        missing = [path for path in artifact_paths(model_dir) if not os.path.exists(path)]
+        if missing:
+            raise CommandError(f"Missing model files: {', '.join(missing)}")
+        arrays_path, manifest_path = convert_pickles(model_dir)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {arrays_path} and {manifest_path}'))
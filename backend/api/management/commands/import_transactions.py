@@ -0,0 +1,119 @@
+import time
+from datetime import timedelta, timezone as dt_timezone
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api.caching import invalidate_transactions
+from api.dataset_cache import open_dataset
+from api.ml_fraud_model import DATA_PATH, MODEL_DIR, ModelCache, ModelNotReady
+from api.models import FEATURE_DTYPE, FEATURE_NAMES, Transaction
+from api.rollups import record_columns
+
+class Command(BaseCommand):
+    help = 'Bulk-imports historical transactions from a creditcard.csv-style file, scoring them with the model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-path', default=DATA_PATH)
+        parser.add_argument('--model-dir', default=MODEL_DIR)
+        parser.add_argument('--chunksize', type=int, default=50000, help='Rows read and scored at once')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per database transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many rows')
+        parser.add_argument('--start', help='Timestamp of Time=0 (ISO 8601); by default the last row lands at now')
+        parser.add_argument('--no-cache', action='store_true', help='Parse the CSV instead of the dataset cache')
+
+    def handle(self, *args, **options):
+        try:
+            bundle = ModelCache(options['model_dir'], auto_train=False).get()
+        except ModelNotReady as e:
+            raise CommandError(f'{e}; run manage.py train_model first')
+        feature_names = bundle.metadata['feature_names']
+
+        chunks, max_time = self.read_chunks(options, feature_names)
+        start = self.start_time(options['start'], max_time)
+
+        begin = time.perf_counter()
+        imported = skipped = flagged = 0
+        for chunk in chunks:
+            if options['limit'] is not None:
+                chunk = chunk.iloc[:options['limit'] - imported - skipped]
+                if chunk.empty:
+                    break
+            counts = self.import_chunk(chunk, bundle, feature_names, start, options['batch_size'])
+            imported, skipped, flagged = imported + counts[0], skipped + counts[1], flagged + counts[2]
+            elapsed = time.perf_counter() - begin
+            self.stdout.write(f"Imported {imported:,} rows ({imported / elapsed:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - begin
+        if skipped:
+            self.stdout.write(f"Skipped {skipped:,} rows with missing features")
+        self.stdout.write(f"Flagged as fraud: {flagged:,}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported:,} transactions in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):,.0f} rows/s)"
+        ))
+
+    def read_chunks(self, options, feature_names):
+        """Chunks with the model features (plus Time if present), and the largest Time"""
+        data_path, chunksize = options['data_path'], options['chunksize']
+        if options['no_cache']:
+            header = pd.read_csv(data_path, nrows=0).columns
+            columns = self.columns(header, feature_names)
+            max_time = pd.read_csv(data_path, usecols=['Time'])['Time'].max() if 'Time' in header else None
+            chunks = pd.read_csv(data_path, usecols=columns, chunksize=chunksize, dtype=np.float64)
+            return chunks, max_time
+
+        dataset = open_dataset(data_path)
+        columns = self.columns(dataset.columns, feature_names)
+        max_time = float(dataset['Time'].max()) if 'Time' in dataset.columns and dataset.rows else None
+        return dataset.iter_chunks(chunksize, columns), max_time
+
+    def columns(self, available, feature_names):
+        missing = [name for name in feature_names if name not in available]
+        if missing:
+            raise CommandError(f"Missing columns: {', '.join(missing)}")
+        return list(feature_names) + (['Time'] if 'Time' in available else [])
+
+    def start_time(self, start, max_time):
+        if start:
+            parsed = parse_datetime(start)
+            if parsed is None:
+                raise CommandError('--start must be an ISO 8601 datetime')
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        return timezone.now() - timedelta(seconds=max_time or 0)
+
+    def import_chunk(self, chunk, bundle, feature_names, start, batch_size):
+        """Score a chunk in one call and insert it; returns (imported, skipped, flagged)"""
+        features = chunk[feature_names].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(features).any(axis=1)
+        features = features[valid]
+        if not len(features):
+            return 0, int((~valid).sum()), 0
+
+        probabilities, is_fraud = bundle.engine.score(features)
+        amounts = np.round(features[:, feature_names.index('Amount')], 2)
+        vectors = chunk[FEATURE_NAMES].to_numpy(dtype=FEATURE_DTYPE)[valid]
+
+        timestamps = np.full(len(features), np.datetime64(start.astimezone(dt_timezone.utc).replace(tzinfo=None), 'us'))
+        if 'Time' in chunk:
+            timestamps += (chunk['Time'].to_numpy(dtype=np.float64)[valid] * 1e6).astype('timedelta64[us]')
+
+        transactions = [
+            Transaction(
+                timestamp=timestamp.replace(tzinfo=dt_timezone.utc), amount=amount,
+                is_fraud=fraud, fraud_probability=probability, feature_vector=vector.tobytes()
+            )
+            for timestamp, amount, fraud, probability, vector in zip(
+                timestamps.tolist(), amounts.tolist(), is_fraud.tolist(), probabilities.tolist(), vectors
+            )
+        ]
+
+        for offset in range(0, len(transactions), batch_size):
+            batch = slice(offset, offset + batch_size)
+            with db_transaction.atomic():
+                Transaction.objects.bulk_create(transactions[batch], batch_size=batch_size)
+                record_columns(timestamps[batch], amounts[batch], is_fraud[batch], probabilities[batch])
+                invalidate_transactions()
+
+        return len(transactions), int((~valid).sum()), int(is_fraud.sum())
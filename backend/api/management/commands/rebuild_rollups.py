@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from api.rollups import GRANULARITIES, rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-minute/per-hour transaction rollups from the Transaction table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--granularity', choices=list(GRANULARITIES), action='append',
+                            help='Only rebuild this granularity (can be repeated)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        buckets = rebuild_rollups(options['granularity'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} rollup buckets in {elapsed:.2f}s'))
@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api.caching import invalidate_transactions
+from api.ml_fraud_model import MODEL_DIR, ModelCache, ModelNotReady, init_scoring_worker, score_in_worker
+from api.models import FEATURE_DTYPE, FEATURE_NAMES, Transaction
+from api.rollups import record_rescores
+
+CHECKPOINT_NAME = 'rescore_checkpoint.json'
+STORED_FEATURES = FEATURE_NAMES + ['Amount']
+
+class Command(BaseCommand):
+    help = 'Re-scores stored transactions with the current model, e.g. after retraining'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-dir', default=MODEL_DIR)
+        parser.add_argument('--since', help='Only transactions with timestamp >= this (ISO 8601)')
+        parser.add_argument('--until', help='Only transactions with timestamp < this (ISO 8601)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Primary keys per chunk')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes; 1 scores in this process')
+        parser.add_argument('--checkpoint', help=f'Progress file (default: <model-dir>/{CHECKPOINT_NAME})')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        model_dir = options['model_dir']
+        try:
+            bundle = ModelCache(model_dir, auto_train=False).get()
+        except ModelNotReady as e:
+            raise CommandError(f'{e}; run manage.py train_model first')
+        feature_names = bundle.metadata['feature_names']
+        missing = [name for name in feature_names if name not in STORED_FEATURES]
+        if missing:
+            raise CommandError(f"The model uses features that are not stored: {', '.join(missing)}")
+        columns = [STORED_FEATURES.index(name) for name in feature_names]
+
+        queryset = Transaction.objects.filter(feature_vector__isnull=False)
+        if options['since']:
+            queryset = queryset.filter(timestamp__gte=self.parse_time(options['since'], '--since'))
+        if options['until']:
+            queryset = queryset.filter(timestamp__lt=self.parse_time(options['until'], '--until'))
+
+        # The run is tied to the model and window it started with; anything else starts over
+        checkpoint_path = options['checkpoint'] or os.path.join(model_dir, CHECKPOINT_NAME)
+        run = {
+            'model_signature': [list(entry) for entry in bundle.signature],
+            'since': options['since'],
+            'until': options['until'],
+        }
+        checkpoint = None if options['restart'] else self.read_checkpoint(checkpoint_path)
+        if checkpoint and all(checkpoint.get(key) == value for key, value in run.items()):
+            first_id, last_id = checkpoint['next_id'], checkpoint['last_id']
+            self.stdout.write(f'Resuming from id {first_id:,}')
+        else:
+            # Rows created after this point are scored by the new model already
+            bounds = queryset.aggregate(first=Min('id'), last=Max('id'))
+            if bounds['first'] is None:
+                self.stdout.write(self.style.SUCCESS('No transactions to rescore'))
+                return
+            first_id, last_id = bounds['first'], bounds['last']
+
+        chunk_size = options['chunk_size']
+        ranges = ((start, start + chunk_size) for start in range(first_id, last_id + 1, chunk_size))
+        begin = time.perf_counter()
+        totals = {'rescored': 0, 'changed': 0, 'skipped': 0}
+
+        def finish(chunk, skipped, end, scores):
+            totals['skipped'] += skipped
+            totals['rescored'] += len(chunk)
+            totals['changed'] += self.write_chunk(chunk, scores)
+            self.write_checkpoint(checkpoint_path, dict(run, next_id=end, last_id=last_id))
+            elapsed = time.perf_counter() - begin
+            self.stdout.write(
+                f"Rescored {totals['rescored']:,} transactions up to id {min(end - 1, last_id):,} "
+                f"({totals['rescored'] / elapsed:,.0f} rows/s)"
+            )
+
+        if options['workers'] <= 1:
+            for start, end in ranges:
+                chunk, features, skipped = self.read_chunk(queryset, start, end, columns)
+                finish(chunk, skipped, end, bundle.engine.score(features) if chunk else None)
+        else:
+            # Score up to two chunks per worker ahead while this process writes the results in order
+            workers = options['workers']
+            with ProcessPoolExecutor(workers, initializer=init_scoring_worker, initargs=(model_dir,)) as pool:
+                pending = deque()
+                for start, end in ranges:
+                    chunk, features, skipped = self.read_chunk(queryset, start, end, columns)
+                    future = pool.submit(score_in_worker, features) if chunk else None
+                    pending.append((chunk, skipped, end, future))
+                    if len(pending) >= workers * 2:
+                        chunk, skipped, end, future = pending.popleft()
+                        finish(chunk, skipped, end, future and future.result())
+                while pending:
+                    chunk, skipped, end, future = pending.popleft()
+                    finish(chunk, skipped, end, future and future.result())
+
+        os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - begin
+        if totals['skipped']:
+            self.stdout.write(f"Skipped {totals['skipped']:,} transactions with missing features")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {totals['rescored']:,} transactions in {elapsed:.1f}s, "
+            f"{totals['changed']:,} changed their fraud flag"
+        ))
+
+    def parse_time(self, value, option):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f'{option} must be an ISO 8601 datetime')
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+    def read_chunk(self, queryset, start, end, columns):
+        """Transactions with start <= id < end that have every feature, their feature matrix, and the rest's count"""
+        rows = queryset.filter(id__gte=start, id__lt=end).only(
+            'id', 'timestamp', 'amount', 'is_fraud', 'fraud_probability', 'feature_vector'
+        ).order_by('id')
+        chunk = list(rows.iterator(chunk_size=2000))
+        if not chunk:
+            return chunk, None, 0
+        vectors = np.frombuffer(b''.join(bytes(t.feature_vector) for t in chunk), dtype=FEATURE_DTYPE)
+        features = np.column_stack([
+            vectors.reshape(len(chunk), len(FEATURE_NAMES)).astype(np.float64),
+            [t.amount for t in chunk],
+        ])[:, columns]
+        valid = ~np.isnan(features).any(axis=1)
+        return [t for t, ok in zip(chunk, valid) if ok], features[valid], int((~valid).sum())
+
+    def write_chunk(self, chunk, scores):
+        """Save the new scores and move the rollups; returns how many fraud flags changed"""
+        if not chunk:
+            return 0
+        probabilities, is_fraud = scores
+        changes = []
+        for t, probability, fraud in zip(chunk, probabilities.tolist(), is_fraud.tolist()):
+            changes.append((t, t.is_fraud, t.fraud_probability))
+            t.fraud_probability, t.is_fraud = probability, fraud
+        with db_transaction.atomic():
+            Transaction.objects.bulk_update(chunk, ['is_fraud', 'fraud_probability'], batch_size=1000)
+            record_rescores(changes)
+            invalidate_transactions()
+        return sum(t.is_fraud != previous for t, previous, _ in changes)
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_checkpoint(self, path, state):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
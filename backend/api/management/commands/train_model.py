@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from api.ml_fraud_model import DATA_PATH, MODEL_DIR
+from api.ml_training import STREAMING_CHUNKSIZE, STREAMING_EPOCHS
+from api.training_job import run_training_job
+
+class Command(BaseCommand):
+    help = 'Trains the fraud model, holding the training lock shared with the API workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-path', default=DATA_PATH)
+        parser.add_argument('--model-dir', default=MODEL_DIR)
+        parser.add_argument('--force', action='store_true', help='Retrain even if a model already exists')
+        parser.add_argument('--streaming', action='store_true', help='Train out-of-core in chunks')
+        parser.add_argument('--chunksize', type=int, default=STREAMING_CHUNKSIZE)
+        parser.add_argument('--epochs', type=int, default=STREAMING_EPOCHS)
+        parser.add_argument('--no-cache', action='store_true', help='Parse the CSV instead of the dataset cache')
+
+    def handle(self, *args, **options):
+        trainer_kwargs = {'use_cache': not options['no_cache']}
+        if options['streaming']:
+            trainer_kwargs.update(chunksize=options['chunksize'], epochs=options['epochs'])
+
+        trained = run_training_job(
+            model_dir=options['model_dir'],
+            data_path=options['data_path'],
+            streaming=options['streaming'],
+            force=options['force'],
+            **trainer_kwargs
+        )
+
+        if trained:
+            self.stdout.write(self.style.SUCCESS(f"Model saved to {options['model_dir']}"))
+        else:
+            self.stdout.write(f"A model already exists in {options['model_dir']}, use --force to retrain")
@@ -0,0 +1,55 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .timing import Recorder, _recorder, record, server_timing_header
+
+class ServerTimingMiddleware:
+    """
+    Times each request's stages (see api.timing) and reports them in a
+    Server-Timing header and the per-view histograms of internal_metrics.
+
+    Works in both sync and async stacks without a thread switch, and
+    drops out of the stack entirely when FRAUD_TIMING_ENABLED is False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.FRAUD_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    def finish(self, request, response, recorder, elapsed):
+        stages = dict(recorder.stages, total=elapsed)
+        response['Server-Timing'] = server_timing_header(stages)
+        # Only routed views get histograms, so random 404 paths can't grow them without bound
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            record(match.url_name, stages)
+        return response
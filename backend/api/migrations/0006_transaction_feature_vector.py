@@ -0,0 +1,75 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:50
+
+import math
+import struct
+
+from django.db import migrations, models
+
+# V1-V28 as little-endian float32, matching api.models.FEATURE_DTYPE
+FEATURE_NAMES = [f'V{i}' for i in range(1, 29)]
+FEATURE_STRUCT = struct.Struct(f'<{len(FEATURE_NAMES)}f')
+BATCH_SIZE = 2000
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def pack_ml_features(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    batch = []
+    queryset = Transaction.objects.only('id', 'ml_features').order_by('pk')
+    for transaction in queryset.iterator(chunk_size=BATCH_SIZE):
+        features = transaction.ml_features or {}
+        if not features:
+            continue
+        transaction.feature_vector = FEATURE_STRUCT.pack(
+            *(_to_float(features.get(name)) for name in FEATURE_NAMES)
+        )
+        batch.append(transaction)
+        if len(batch) >= BATCH_SIZE:
+            Transaction.objects.bulk_update(batch, ['feature_vector'])
+            batch = []
+    if batch:
+        Transaction.objects.bulk_update(batch, ['feature_vector'])
+
+
+def unpack_feature_vector(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    batch = []
+    queryset = Transaction.objects.exclude(feature_vector=None).only('id', 'feature_vector').order_by('pk')
+    for transaction in queryset.iterator(chunk_size=BATCH_SIZE):
+        values = FEATURE_STRUCT.unpack(bytes(transaction.feature_vector))
+        # NaN marks a feature that was missing from the original JSON
+        transaction.ml_features = {
+            name: value for name, value in zip(FEATURE_NAMES, values) if not math.isnan(value)
+        }
+        batch.append(transaction)
+        if len(batch) >= BATCH_SIZE:
+            Transaction.objects.bulk_update(batch, ['ml_features'])
+            batch = []
+    if batch:
+        Transaction.objects.bulk_update(batch, ['ml_features'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='feature_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_ml_features, unpack_feature_vector),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='ml_features',
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_transaction_feature_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('fraud_count', models.IntegerField(default=0)),
+                ('amount_sum', models.FloatField(default=0.0)),
+                ('fraud_amount_sum', models.FloatField(default=0.0)),
+                ('probability_bin_0', models.IntegerField(default=0)),
+                ('probability_bin_1', models.IntegerField(default=0)),
+                ('probability_bin_2', models.IntegerField(default=0)),
+                ('probability_bin_3', models.IntegerField(default=0)),
+                ('probability_bin_4', models.IntegerField(default=0)),
+                ('probability_bin_5', models.IntegerField(default=0)),
+                ('probability_bin_6', models.IntegerField(default=0)),
+                ('probability_bin_7', models.IntegerField(default=0)),
+                ('probability_bin_8', models.IntegerField(default=0)),
+                ('probability_bin_9', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['granularity', 'bucket_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='transactionrollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'bucket_start'), name='rollup_granularity_bucket_uniq'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from datetime import timezone as dt_timezone
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour, TruncMinute
+
+# A frozen copy of api.rollups.rebuild_rollups() as of 0007, so later changes there can't break migrate
+PROBABILITY_BINS = 10
+GRANULARITIES = {'minute': TruncMinute, 'hour': TruncHour}
+
+
+def bin_filter(index):
+    condition = Q()
+    if index > 0:
+        condition &= Q(fraud_probability__gte=index / PROBABILITY_BINS)
+    if index < PROBABILITY_BINS - 1:
+        condition &= Q(fraud_probability__lt=(index + 1) / PROBABILITY_BINS)
+    return condition
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionRollup = apps.get_model('api', 'TransactionRollup')
+
+    fraud = Q(is_fraud=True)
+    aggregates = {
+        'count': Count('id'),
+        'fraud_count': Count('id', filter=fraud),
+        'amount_sum': Coalesce(Sum('amount'), Value(0.0)),
+        'fraud_amount_sum': Coalesce(Sum('amount', filter=fraud), Value(0.0)),
+    }
+    aggregates.update({f'probability_bin_{i}': Count('id', filter=bin_filter(i)) for i in range(PROBABILITY_BINS)})
+
+    for granularity, truncate in GRANULARITIES.items():
+        rows = (
+            Transaction.objects.order_by()
+            .annotate(bucket=truncate('timestamp', tzinfo=dt_timezone.utc))
+            .values('bucket')
+            .annotate(**aggregates)
+        )
+        TransactionRollup.objects.filter(granularity=granularity).delete()
+        TransactionRollup.objects.bulk_create(
+            [TransactionRollup(granularity=granularity, bucket_start=row.pop('bucket'), **row) for row in rows],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_transaction_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,176 +1,316 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-import joblib
+import logging
 import os
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from .model_artifact import arrays_from_sklearn, artifact_exists, artifact_files, load_artifact
+from .scoring import FeatureValidator, ScoringEngine, top_contributions
+from .timing import span
 
-def train_fraud_model():
-    # Check if data file exists
-    data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'creditcard.csv')
-    if not os.path.exists(data_path):
-        raise FileNotFoundError(f"Data file not found at {data_path}")
+# Training lives in api.ml_training so serving never imports pandas, sklearn or joblib;
+# joblib is only imported to read model dirs that have no consolidated artifact yet.
 
-    # Load and prepare data
-    print("Loading data...")
-    df = pd.read_csv(data_path)
-    
-    # Separate features and target
-    X = df.drop(['Class', 'Time'], axis=1)
-    y = df['Class']
-    
-    # Split the data
-    print("Splitting data into train and test sets...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'creditcard.csv')
+MODEL_DIR = os.path.join(BASE_DIR, 'models')
+
+MODEL_FILENAME = 'fraud_model.pkl'
+SCALER_FILENAME = 'scaler.pkl'
+METADATA_FILENAME = 'model_metadata.pkl'
+
+# Number of features returned in top_contributing_features
+TOP_CONTRIBUTORS = 5
+
+def artifact_paths(model_dir=MODEL_DIR):
+    """Return the model, scaler and metadata paths inside model_dir"""
+    return (
+        os.path.join(model_dir, MODEL_FILENAME),
+        os.path.join(model_dir, SCALER_FILENAME),
+        os.path.join(model_dir, METADATA_FILENAME),
     )
-    
-    # Scale the features
-    print("Scaling features...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # Train the model
-    print("Training logistic regression model...")
-    model = LogisticRegression(random_state=42, max_iter=1000, class_weight='balanced')
-    model.fit(X_train_scaled, y_train)
-    
-    # Evaluate the model
-    y_pred = model.predict(X_test_scaled)
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-    
-    # Calculate and print metrics
-    print("\nModel Evaluation Metrics:")
-    print("-" * 50)
-    print("Classification Report:")
-    print(classification_report(y_test, y_pred))
-    
-    print("\nConfusion Matrix:")
-    conf_matrix = confusion_matrix(y_test, y_pred)
-    print(conf_matrix)
-    
-    print("\nROC AUC Score:", roc_auc_score(y_test, y_pred_proba))
-    
-    # Calculate feature importance
-    feature_importance = pd.DataFrame({
-        'feature': X.columns,
-        'importance': abs(model.coef_[0])
-    }).sort_values('importance', ascending=False)
-    
-    print("\nTop 10 Most Important Features:")
-    print(feature_importance.head(10))
-    
-    # Save model metadata
-    metadata = {
-        'feature_importance': dict(zip(feature_importance['feature'], feature_importance['importance'])),
-        'threshold': 0.5,  # Default threshold
-        'feature_names': list(X.columns),
-        'training_date': pd.Timestamp.now().isoformat()
-    }
-    
-    # Save both the model and scaler
-    model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
-    os.makedirs(model_dir, exist_ok=True)
-    
-    model_path = os.path.join(model_dir, 'fraud_model.pkl')
-    scaler_path = os.path.join(model_dir, 'scaler.pkl')
-    metadata_path = os.path.join(model_dir, 'model_metadata.pkl')
-    
-    print(f"\nSaving model and metadata to {model_dir}")
-    joblib.dump(model, model_path)
-    joblib.dump(scaler, scaler_path)
-    joblib.dump(metadata, metadata_path)
-    
-    return model, scaler, metadata
+
+def serving_paths(model_dir=MODEL_DIR):
+    """The files ModelCache loads: the consolidated artifact if present, else the pickles"""
+    if artifact_exists(model_dir):
+        return artifact_files(model_dir)
+    return artifact_paths(model_dir)
+
+class ModelNotReady(RuntimeError):
+    """Raised while the model artifacts are still being trained"""
+
+ModelBundle = namedtuple(
+    'ModelBundle', ['model', 'scaler', 'metadata', 'engine', 'validator', 'signature', 'version']
+)
+
+class ModelCache:
+    """
+    Process-wide holder for the trained model, scaler and metadata.
+
+    The consolidated artifact (see api.model_artifact) is loaded when
+    present; bundles loaded from it have model and scaler set to None.
+    Otherwise the joblib pickles are unpickled.
+
+    Artifacts are loaded once and served from memory. At most every
+    check_interval seconds the files are stat()ed; when their mtime or size
+    changed (and they have not been touched for settle_time seconds) a complete
+    new bundle is loaded and swapped in with a single assignment, so callers
+    never see a model from one version and a scaler from another.
+
+    Each bundle also carries a ScoringEngine compiled from the scaler and
+    model (pass dtype=np.float32 to score in single precision) and a
+    FeatureValidator compiled from the metadata schema.
+
+    If no model has been trained yet, get() starts training in the background
+    (one trainer per host, see api.training_job) and raises ModelNotReady
+    until the artifacts appear, instead of training inside the request.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, check_interval=1.0, settle_time=2.0, dtype=np.float64,
+                 data_path=DATA_PATH, auto_train=True):
+        self.model_dir = model_dir
+        self.data_path = data_path
+        self.auto_train = auto_train
+        self.check_interval = check_interval
+        self.settle_time = settle_time
+        self.dtype = dtype
+        self._bundle = None
+        self._failed_signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        """(mtime_ns, size) of every artifact, or None if any of them is missing"""
+        signature = []
+        for path in serving_paths(self.model_dir):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _is_settling(self, signature):
+        newest_mtime = max(mtime_ns for mtime_ns, _ in signature) / 1e9
+        return time.time() - newest_mtime < self.settle_time
+
+    def _load(self, version, attempts=3):
+        for _ in range(attempts):
+            signature = self._signature()
+            if artifact_exists(self.model_dir):
+                model = scaler = None
+                arrays, metadata = load_artifact(self.model_dir)
+            else:
+                import joblib
+                model_path, scaler_path, metadata_path = artifact_paths(self.model_dir)
+                model = joblib.load(model_path)
+                scaler = joblib.load(scaler_path)
+                metadata = joblib.load(metadata_path)
+                arrays = arrays_from_sklearn(scaler, model)
+            
+            # Only accept the set if nothing was replaced while we were reading it
+            if self._signature() == signature:
+                engine = ScoringEngine(
+                    arrays['mean'], arrays['scale'], arrays['coef'], arrays['intercept'],
+                    metadata['threshold'], self.dtype
+                )
+                validator = FeatureValidator(metadata['feature_names'], metadata.get('feature_bounds'))
+                return ModelBundle(model, scaler, metadata, engine, validator, signature, version)
+        raise RuntimeError('Model artifacts kept changing while loading')
+
+    def get(self):
+        """Return the current ModelBundle, reloading it if the artifacts changed"""
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() < self._next_check:
+            return bundle
+        
+        with self._lock:
+            bundle = self._bundle
+            if bundle is not None and time.monotonic() < self._next_check:
+                return bundle
+            self._next_check = time.monotonic() + self.check_interval
+            
+            signature = self._signature()
+            if bundle is not None and (signature is None or signature == bundle.signature):
+                return bundle
+            if bundle is not None and (signature == self._failed_signature or self._is_settling(signature)):
+                return bundle
+            
+            if signature is None:
+                self._next_check = 0.0
+                raise ModelNotReady(self._start_training())
+            
+            version = bundle.version + 1 if bundle is not None else 1
+            try:
+                self._bundle = self._load(version)
+            except Exception:
+                if bundle is None:
+                    raise
+                self._failed_signature = signature
+                logger.exception('Failed to reload model from %s, keeping version %s',
+                                 self.model_dir, bundle.version)
+                return bundle
+            
+            if bundle is not None:
+                logger.info('Reloaded model from %s (version %s)', self.model_dir, version)
+            return self._bundle
+
+    def _start_training(self):
+        """Kick off background training and describe the state for ModelNotReady"""
+        if not self.auto_train:
+            return f'No trained model found in {self.model_dir}'
+        from .training_job import start_background_training
+        if start_background_training(self.model_dir, self.data_path):
+            return 'Model is warming up, retry shortly'
+        return 'Model training failed, retrying later'
+
+    def invalidate(self):
+        """Force the next get() to re-check the artifacts on disk"""
+        self._next_check = 0.0
+
+_model_cache = ModelCache()
+
+def get_model_bundle():
+    """Return the process-wide ModelBundle"""
+    return _model_cache.get()
+
+_worker_cache = None
+
+def preload_model():
+    """
+    Load the model in this process ahead of the first request, e.g. in the
+    master of a pre-forking server so the workers inherit it. Returns the
+    bundle, or None if nothing has been trained yet (training is left to the
+    workers, a master must not start threads before forking).
+    """
+    if not all(os.path.exists(path) for path in serving_paths(_model_cache.model_dir)):
+        return None
+    _model_cache.invalidate()
+    return _model_cache.get()
+
+def init_scoring_worker(model_dir):
+    """ProcessPoolExecutor initializer: load the model once per worker process"""
+    global _worker_cache
+    _worker_cache = ModelCache(model_dir, auto_train=False)
+    _worker_cache.get()
+
+def score_in_worker(features):
+    """(probabilities, is_fraud) for a feature matrix, in a process set up by init_scoring_worker()"""
+    return _worker_cache.get().engine.score(features)
 
 def load_model():
     """Load the trained model, scaler, and metadata"""
-    model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
-    model_path = os.path.join(model_dir, 'fraud_model.pkl')
-    scaler_path = os.path.join(model_dir, 'scaler.pkl')
-    metadata_path = os.path.join(model_dir, 'model_metadata.pkl')
-    
-    if not all(os.path.exists(p) for p in [model_path, scaler_path, metadata_path]):
-        model, scaler, metadata = train_fraud_model()
-    else:
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
-        metadata = joblib.load(metadata_path)
-    
-    return model, scaler, metadata
+    bundle = get_model_bundle()
+    if bundle.model is not None:
+        return bundle.model, bundle.scaler, bundle.metadata
+    # Served from the consolidated artifact; the sklearn objects are only unpickled on request
+    model, scaler = _load_estimators(_model_cache.model_dir, bundle.signature)
+    return model, scaler, bundle.metadata
+
+@lru_cache(maxsize=2)
+def _load_estimators(model_dir, signature):
+    import joblib
+    model_path, scaler_path, _ = artifact_paths(model_dir)
+    return joblib.load(model_path), joblib.load(scaler_path)
+
+@lru_cache(maxsize=8)
+def _validator_for(feature_names):
+    return FeatureValidator(feature_names)
 
 def validate_features(features_dict, feature_names):
     """Validate input features"""
-    errors = []
-    
-    # Check for missing or extra features
-    missing_features = set(feature_names) - set(features_dict.keys())
-    extra_features = set(features_dict.keys()) - set(feature_names)
+    _, errors = _validator_for(tuple(feature_names)).validate(features_dict)
+    return errors
+
+def _score_rows(bundle, features, explain=True):
+    """Score an already validated N x F feature matrix"""
+    engine, metadata = bundle.engine, bundle.metadata
+    feature_names = metadata['feature_names']
     
-    if missing_features:
-        errors.append(f"Missing features: {', '.join(missing_features)}")
-    if extra_features:
-        errors.append(f"Extra features not used by model: {', '.join(extra_features)}")
+    # Scale and predict the whole batch with one fused dot product
+    with span('score'):
+        probabilities, predictions = engine.score(features)
+        amounts = features[:, feature_names.index('Amount')]
+        
+        model_info = {
+            'training_date': metadata['training_date'],
+            'threshold': metadata['threshold']
+        }
+        results = [
+            {
+                'is_fraud': is_fraud,
+                'fraud_probability': probability,
+                'transaction_amount': amount,
+                'model_info': dict(model_info)
+            }
+            for is_fraud, probability, amount in zip(
+                predictions.tolist(), probabilities.tolist(), amounts.tolist()
+            )
+        ]
     
-    # Validate feature values
-    for feature, value in features_dict.items():
-        if feature in feature_names:
-            try:
-                float_value = float(value)
-                # Check for reasonable ranges (adjust these based on your data)
-                if abs(float_value) > 100 and feature != 'Amount':
-                    errors.append(f"Feature {feature} has unusually large value: {float_value}")
-                if feature == 'Amount' and (float_value <= 0 or float_value > 25000):
-                    errors.append(f"Amount {float_value} is outside reasonable range (0-25000)")
-            except ValueError:
-                errors.append(f"Feature {feature} has invalid value: {value}")
+    # Get top contributing features, computed on the scaled inputs
+    if explain:
+        with span('explain'):
+            explanations = top_contributions(engine.contributions(features), feature_names, TOP_CONTRIBUTORS)
+            for result, top_features in zip(results, explanations):
+                result['top_contributing_features'] = top_features
     
-    return errors
+    return results
 
-def predict_fraud(features_dict):
-    """Predict whether a transaction is fraudulent"""
-    model, scaler, metadata = load_model()
-    feature_names = metadata['feature_names']
+def predict_fraud(features_dict, explain=True):
+    """
+    Predict whether a transaction is fraudulent.
+
+    With explain=False the top_contributing_features are not computed and
+    left out of the result.
+    """
+    with span('load_model'):
+        bundle = get_model_bundle()
     
-    # Validate input features
-    validation_errors = validate_features(features_dict, feature_names)
+    # Validate input features and put them in model order
+    with span('validate'):
+        features, validation_errors = bundle.validator.validate(features_dict)
     if validation_errors:
         raise ValueError('\n'.join(validation_errors))
     
-    # Prepare features in correct order
-    features = [float(features_dict[fname]) for fname in feature_names]
-    features_array = np.array(features).reshape(1, -1)
-    
-    # Scale features and predict
-    features_scaled = scaler.transform(features_array)
-    prediction = model.predict(features_scaled)
-    probability = model.predict_proba(features_scaled)[0][1]
-    
-    # Get top contributing features
-    feature_contributions = []
-    for fname, importance, value in zip(feature_names, model.coef_[0], features):
-        contribution = abs(importance * value)
-        feature_contributions.append((fname, contribution))
+    return _score_rows(bundle, features.reshape(1, -1), explain)[0]
+
+def predict_fraud_batch(features_list, explain=True):
+    """Predict a list of transactions in a single vectorized pass"""
+    with span('load_model'):
+        bundle = get_model_bundle()
     
-    top_contributors = sorted(feature_contributions, key=lambda x: abs(x[1]), reverse=True)[:5]
+    # Validate every transaction up front so a batch is scored all-or-nothing
+    with span('validate'):
+        features, row_errors = bundle.validator.validate_batch(features_list)
+    validation_errors = [
+        f"Transaction {index}: {error}"
+        for index, errors in enumerate(row_errors)
+        for error in errors
+    ]
+    if validation_errors:
+        raise ValueError('\n'.join(validation_errors))
     
-    return {
-        'is_fraud': bool(prediction[0]),
-        'fraud_probability': float(probability),
-        'transaction_amount': float(features_dict['Amount']),
-        'top_contributing_features': [
-            {'feature': f, 'contribution': float(c)} 
-            for f, c in top_contributors
-        ],
-        'model_info': {
-            'training_date': metadata['training_date'],
-            'threshold': metadata['threshold']
-        }
-    }
+    return _score_rows(bundle, features, explain)
 
-if __name__ == '__main__':
-    # Train and save the model
-    train_fraud_model()
+def predict_fraud_rows(features_list, explain=True):
+    """
+    Score independent transactions in one vectorized pass.
+
+    Unlike predict_fraud_batch an invalid row doesn't fail the others: its
+    slot in the returned list holds the ValueError instead of a result.
+    """
+    with span('load_model'):
+        bundle = get_model_bundle()
+    with span('validate'):
+        features, row_errors = bundle.validator.validate_batch(features_list)
+    
+    results = [ValueError('\n'.join(errors)) if errors else None for errors in row_errors]
+    valid_rows = [index for index, errors in enumerate(row_errors) if not errors]
+    if valid_rows:
+        for index, result in zip(valid_rows, _score_rows(bundle, features[valid_rows], explain)):
+            results[index] = result
+    return results
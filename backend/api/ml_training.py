@@ -0,0 +1,264 @@
+"""
+Training and evaluation of the fraud model.
+
+Kept apart from api.ml_fraud_model, the serving side, because pandas and
+sklearn take hundreds of milliseconds and tens of MB to import; only the
+train_model command, the background training job and the converter need
+them.
+"""
+import pandas as pd
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+import joblib
+import os
+from .dataset_cache import open_dataset
+from .ml_fraud_model import DATA_PATH, MODEL_DIR, artifact_paths
+from .model_artifact import arrays_from_sklearn, save_artifact
+
+# Validation bounds are the training quantiles widened by MARGIN times their spread
+FEATURE_BOUND_QUANTILES = (0.0005, 0.9995)
+FEATURE_BOUND_MARGIN = 1.0
+
+# Streaming training defaults
+STREAMING_CHUNKSIZE = 100000
+STREAMING_EPOCHS = 5
+AUC_HISTOGRAM_BINS = 1000
+
+def _atomic_dump(obj, path):
+    """Dump obj next to path and rename it into place so readers never see a partial file"""
+    tmp_path = f'{path}.tmp'
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def learn_feature_bounds(X):
+    """Per-feature (lower, upper) validation bounds learned from training data"""
+    low, high = X.quantile(list(FEATURE_BOUND_QUANTILES)).to_numpy()
+    margin = (high - low) * FEATURE_BOUND_MARGIN
+    return {
+        name: (float(lower), float(upper))
+        for name, lower, upper in zip(X.columns, low - margin, high + margin)
+    }
+
+def train_fraud_model(data_path=DATA_PATH, model_dir=MODEL_DIR, use_cache=True):
+    # Check if data file exists
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"Data file not found at {data_path}")
+
+    # Load and prepare data, memory-mapped from the binary cache unless disabled
+    print("Loading data...")
+    if use_cache:
+        df = open_dataset(data_path).to_frame()
+    else:
+        df = pd.read_csv(data_path)
+    
+    # Separate features and target
+    X = df.drop(['Class', 'Time'], axis=1)
+    y = df['Class']
+    
+    # Split the data
+    print("Splitting data into train and test sets...")
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    
+    # Scale the features
+    print("Scaling features...")
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # Train the model
+    print("Training logistic regression model...")
+    model = LogisticRegression(random_state=42, max_iter=1000, class_weight='balanced')
+    model.fit(X_train_scaled, y_train)
+    
+    # Evaluate the model
+    y_pred = model.predict(X_test_scaled)
+    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
+    
+    # Calculate and print metrics
+    print("\nModel Evaluation Metrics:")
+    print("-" * 50)
+    print("Classification Report:")
+    print(classification_report(y_test, y_pred))
+    
+    print("\nConfusion Matrix:")
+    conf_matrix = confusion_matrix(y_test, y_pred)
+    print(conf_matrix)
+    
+    print("\nROC AUC Score:", roc_auc_score(y_test, y_pred_proba))
+    
+    # Calculate feature importance
+    feature_importance = _feature_importance(X.columns, model.coef_[0])
+    
+    print("\nTop 10 Most Important Features:")
+    print(feature_importance.head(10))
+    
+    # Save model metadata
+    metadata = {
+        'feature_importance': dict(zip(feature_importance['feature'], feature_importance['importance'])),
+        'threshold': 0.5,  # Default threshold
+        'feature_names': list(X.columns),
+        'feature_bounds': learn_feature_bounds(X_train),
+        'training_date': pd.Timestamp.now().isoformat()
+    }
+    
+    _save_artifacts(model, scaler, metadata, model_dir)
+    return model, scaler, metadata
+
+def _feature_importance(feature_names, coef):
+    return pd.DataFrame({
+        'feature': list(feature_names),
+        'importance': np.abs(coef)
+    }).sort_values('importance', ascending=False)
+
+def _save_artifacts(model, scaler, metadata, model_dir):
+    """Save the model, scaler and metadata into model_dir, as pickles and as the consolidated artifact"""
+    os.makedirs(model_dir, exist_ok=True)
+    model_path, scaler_path, metadata_path = artifact_paths(model_dir)
+    
+    # Each file is renamed into place so a running server never reads a partial pickle
+    print(f"\nSaving model and metadata to {model_dir}")
+    _atomic_dump(model, model_path)
+    _atomic_dump(scaler, scaler_path)
+    _atomic_dump(metadata, metadata_path)
+    save_artifact(model_dir, arrays_from_sklearn(scaler, model), metadata)
+
+def convert_pickles(model_dir=MODEL_DIR):
+    """Write the consolidated artifact for a model_dir that only has the pickles"""
+    model_path, scaler_path, metadata_path = artifact_paths(model_dir)
+    model, scaler, metadata = joblib.load(model_path), joblib.load(scaler_path), joblib.load(metadata_path)
+    return save_artifact(model_dir, arrays_from_sklearn(scaler, model), metadata)
+
+def _iter_split_chunks(data_path, chunksize, test_size, random_state, use_cache=True):
+    """
+    Read data_path in float32 chunks and yield (X_train, y_train, X_test, y_test).
+
+    Rows are assigned to the held-out stream by a seeded RNG, so every pass
+    over the file sees exactly the same split.
+    """
+    if use_cache:
+        chunks = open_dataset(data_path).iter_chunks(chunksize)
+    else:
+        columns = pd.read_csv(data_path, nrows=0).columns
+        dtypes = {column: np.float32 for column in columns}
+        dtypes['Class'] = np.int8
+        chunks = pd.read_csv(data_path, chunksize=chunksize, dtype=dtypes)
+    
+    rng = np.random.default_rng(random_state)
+    for chunk in chunks:
+        X = chunk.drop(columns=['Class', 'Time'])
+        y = chunk['Class'].to_numpy()
+        is_test = rng.random(len(chunk)) < test_size
+        yield X[~is_test], y[~is_test], X[is_test], y[is_test]
+
+def _histogram_auc(positive_counts, negative_counts):
+    """ROC AUC from per-bin probability counts, counting same-bin pairs as ties"""
+    negatives_below = np.cumsum(negative_counts) - negative_counts
+    pairs = positive_counts.sum() * negative_counts.sum()
+    if not pairs:
+        return float('nan')
+    return float((positive_counts * (negatives_below + 0.5 * negative_counts)).sum() / pairs)
+
+def train_fraud_model_streaming(data_path=DATA_PATH, model_dir=MODEL_DIR, chunksize=STREAMING_CHUNKSIZE,
+                                epochs=STREAMING_EPOCHS, test_size=0.2, random_state=42, use_cache=True):
+    """
+    Train the fraud model without loading the dataset into memory.
+
+    The CSV is read chunk by chunk as float32: one pass fits the scaler with
+    partial_fit, then each epoch trains an SGD logistic regression with
+    partial_fit. Evaluation on the held-out rows only keeps a confusion matrix
+    and a probability histogram, so peak memory depends on chunksize alone.
+    With use_cache the passes read the memory-mapped dataset cache instead
+    of re-parsing the CSV.
+    """
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"Data file not found at {data_path}")
+    
+    def chunks():
+        return _iter_split_chunks(data_path, chunksize, test_size, random_state, use_cache)
+    
+    # First pass: scaler statistics, class counts and validation bounds
+    print("Fitting scaler on streamed data...")
+    scaler = StandardScaler()
+    class_counts = np.zeros(2, dtype=np.int64)
+    lower = upper = None
+    for X_train, y_train, _, _ in chunks():
+        if not len(X_train):
+            continue
+        scaler.partial_fit(X_train)
+        class_counts += np.bincount(y_train, minlength=2)[:2]
+        chunk_bounds = learn_feature_bounds(X_train)
+        chunk_lower = np.array([low for low, _ in chunk_bounds.values()])
+        chunk_upper = np.array([high for _, high in chunk_bounds.values()])
+        lower = chunk_lower if lower is None else np.minimum(lower, chunk_lower)
+        upper = chunk_upper if upper is None else np.maximum(upper, chunk_upper)
+        feature_names = list(X_train.columns)
+    
+    if not class_counts.all():
+        raise ValueError("Training data must contain both fraudulent and legitimate transactions")
+    
+    # Same weighting as class_weight='balanced', applied per sample
+    class_weights = class_counts.sum() / (2.0 * class_counts)
+    
+    # Remaining passes: incremental logistic regression
+    model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=random_state)
+    for epoch in range(epochs):
+        print(f"Training epoch {epoch + 1}/{epochs}...")
+        for X_train, y_train, _, _ in chunks():
+            if len(X_train):
+                model.partial_fit(scaler.transform(X_train), y_train,
+                                  classes=[0, 1], sample_weight=class_weights[y_train])
+    
+    # Evaluate on the held-out stream
+    conf_matrix = np.zeros((2, 2), dtype=np.int64)
+    histograms = np.zeros((2, AUC_HISTOGRAM_BINS), dtype=np.int64)
+    for _, _, X_test, y_test in chunks():
+        if not len(X_test):
+            continue
+        y_pred_proba = model.predict_proba(scaler.transform(X_test))[:, 1]
+        y_pred = (y_pred_proba > 0.5).astype(np.int64)
+        np.add.at(conf_matrix, (y_test, y_pred), 1)
+        bins = np.minimum((y_pred_proba * AUC_HISTOGRAM_BINS).astype(np.int64), AUC_HISTOGRAM_BINS - 1)
+        np.add.at(histograms, (y_test, bins), 1)
+    
+    print("\nModel Evaluation Metrics:")
+    print("-" * 50)
+    print("Confusion Matrix:")
+    print(conf_matrix)
+    print("\nROC AUC Score:", _histogram_auc(histograms[1], histograms[0]))
+    
+    feature_importance = _feature_importance(feature_names, model.coef_[0])
+    print("\nTop 10 Most Important Features:")
+    print(feature_importance.head(10))
+    
+    metadata = {
+        'feature_importance': dict(zip(feature_importance['feature'], feature_importance['importance'])),
+        'threshold': 0.5,  # Default threshold
+        'feature_names': feature_names,
+        'feature_bounds': {
+            name: (float(low), float(high)) for name, low, high in zip(feature_names, lower, upper)
+        },
+        'training_date': pd.Timestamp.now().isoformat()
+    }
+    
+    _save_artifacts(model, scaler, metadata, model_dir)
+    return model, scaler, metadata
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Train and save the fraud model')
+    parser.add_argument('--streaming', action='store_true', help='Train out-of-core in chunks')
+    parser.add_argument('--chunksize', type=int, default=STREAMING_CHUNKSIZE)
+    parser.add_argument('--epochs', type=int, default=STREAMING_EPOCHS)
+    parser.add_argument('--no-cache', action='store_true', help='Parse the CSV instead of the dataset cache')
+    args = parser.parse_args()
+    
+    # Train and save the model
+    if args.streaming:
+        train_fraud_model_streaming(chunksize=args.chunksize, epochs=args.epochs, use_cache=not args.no_cache)
+    else:
+        train_fraud_model(use_cache=not args.no_cache)
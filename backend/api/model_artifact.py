@@ -0,0 +1,131 @@
+"""
+Consolidated model artifact: fraud_model.npy + fraud_model.json.
+
+The .npy is one uncompressed float64 vector holding the arrays
+ScoringEngine needs (scaler mean/scale and the logistic regression
+coef/intercept) back to back; the JSON manifest records where each one
+starts and how long it is, along with the format version, feature names,
+threshold, training date and the rest of the metadata, plus a SHA-256 of
+the arrays. load_artifact() memory-maps the .npy read-only, so the arrays
+are views of the page cache shared by every process serving the model
+rather than private copies, and loading needs neither sklearn nor joblib.
+
+Directories holding a version 1 artifact (fraud_model.npz) are served from
+their pickles until retrained or run through manage.py convert_model.
+
+The manifest is written last, so a reader never sees a manifest whose
+checksum doesn't cover the arrays next to it; a torn pair fails the
+checksum instead of loading mismatched weights.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+ARTIFACT_FORMAT = 'fraud-model'
+ARTIFACT_VERSION = 2
+ARRAYS_FILENAME = 'fraud_model.npy'
+MANIFEST_FILENAME = 'fraud_model.json'
+ARRAY_NAMES = ('mean', 'scale', 'coef', 'intercept')
+
+class ArtifactError(ValueError):
+    """The artifact is missing arrays, of an unknown version, or fails its checksum"""
+
+def artifact_files(model_dir):
+    """Return the arrays and manifest paths inside model_dir"""
+    return os.path.join(model_dir, ARRAYS_FILENAME), os.path.join(model_dir, MANIFEST_FILENAME)
+
+def artifact_exists(model_dir):
+    return all(os.path.exists(path) for path in artifact_files(model_dir))
+
+def arrays_from_sklearn(scaler, model):
+    """The artifact arrays of a fitted StandardScaler and binary linear classifier"""
+    n_features = model.coef_.shape[1]
+    return {
+        'mean': scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features),
+        'scale': scaler.scale_ if scaler.scale_ is not None else np.ones(n_features),
+        'coef': model.coef_[0],
+        'intercept': np.ravel(model.intercept_)[:1],
+    }
+
+def arrays_checksum(arrays):
+    """SHA-256 over the name, dtype, shape and bytes of every array"""
+    digest = hashlib.sha256()
+    for name in ARRAY_NAMES:
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f'{name}:{array.dtype.str}:{array.shape};'.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def save_artifact(model_dir, arrays, metadata, model_type='logistic_regression'):
+    """Write arrays and metadata into model_dir, each file renamed into place"""
+    os.makedirs(model_dir, exist_ok=True)
+    arrays_path, manifest_path = artifact_files(model_dir)
+    arrays = {name: np.ravel(np.asarray(arrays[name], dtype=np.float64)) for name in ARRAY_NAMES}
+
+    layout, offset = {}, 0
+    for name in ARRAY_NAMES:
+        layout[name] = [offset, len(arrays[name])]
+        offset += len(arrays[name])
+    tmp_path = f'{arrays_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.concatenate([arrays[name] for name in ARRAY_NAMES]))
+    os.replace(tmp_path, arrays_path)
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_VERSION,
+        'model_type': model_type,
+        'checksum': arrays_checksum(arrays),
+        'arrays': layout,
+        'metadata': _jsonable(metadata),
+    }
+    tmp_path = f'{manifest_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return arrays_path, manifest_path
+
+def load_artifact(model_dir):
+    """
+    Return (arrays, metadata) from model_dir, raising ArtifactError if they
+    don't check out. The arrays are read-only views of the memory-mapped .npy.
+    """
+    arrays_path, manifest_path = artifact_files(model_dir)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('format_version') != ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"Unsupported model artifact {manifest.get('format')!r} version {manifest.get('format_version')!r}"
+        )
+
+    layout = manifest.get('arrays', {})
+    missing = [name for name in ARRAY_NAMES if name not in layout]
+    if missing:
+        raise ArtifactError(f"Model artifact is missing arrays: {', '.join(missing)}")
+    data = np.load(arrays_path, mmap_mode='r', allow_pickle=False)
+    if data.ndim != 1 or data.dtype != np.float64:
+        raise ArtifactError(f'{ARRAYS_FILENAME} is not a float64 vector')
+    arrays = {}
+    for name in ARRAY_NAMES:
+        start, length = layout[name]
+        if start + length > len(data):
+            raise ArtifactError(f'{ARRAYS_FILENAME} is too short for {name}')
+        arrays[name] = data[start:start + length]
+    if arrays_checksum(arrays) != manifest['checksum']:
+        raise ArtifactError(f'Checksum mismatch between {ARRAYS_FILENAME} and {MANIFEST_FILENAME}')
+
+    metadata = manifest['metadata']
+    # Bounds were (lower, upper) tuples before the JSON round trip
+    if metadata.get('feature_bounds'):
+        metadata['feature_bounds'] = {name: tuple(bounds) for name, bounds in metadata['feature_bounds'].items()}
+    return arrays, metadata
@@ -1,5 +1,10 @@
+import numpy as np
 from django.db import models
 
+# Layout of Transaction.feature_vector: V1-V28 as little-endian float32
+FEATURE_NAMES = [f'V{i}' for i in range(1, 29)]
+FEATURE_DTYPE = np.dtype('<f4')
+
 class Transaction(models.Model):
     # User-visible fields
     timestamp = models.DateTimeField()
@@ -13,10 +18,97 @@ class Transaction(models.Model):
     # ML-related fields
     is_fraud = models.BooleanField(default=False)
     fraud_probability = models.FloatField(default=0.0)
-    ml_features = models.JSONField(default=dict)  # Store V1-V28 here
+    feature_vector = models.BinaryField(null=True, blank=True)  # V1-V28, see FEATURE_DTYPE
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination of the transaction list, optionally by fraud flag
+            models.Index(fields=['-created_at', '-id'], name='txn_created_id_idx'),
+            models.Index(fields=['is_fraud', '-created_at', '-id'], name='txn_fraud_created_id_idx'),
+            # Range filters
+            models.Index(fields=['timestamp'], name='txn_timestamp_idx'),
+            models.Index(fields=['fraud_probability'], name='txn_probability_idx'),
+            models.Index(fields=['amount'], name='txn_amount_idx'),
+        ]
+
+    @property
+    def features_array(self):
+        """V1-V28 as a read-only float32 NumPy array (None if not stored)"""
+        if self.feature_vector is None:
+            return None
+        return np.frombuffer(self.feature_vector, dtype=FEATURE_DTYPE)
+
+    @features_array.setter
+    def features_array(self, values):
+        values = np.asarray(values, dtype=FEATURE_DTYPE)
+        if values.shape != (len(FEATURE_NAMES),):
+            raise ValueError(f"Expected {len(FEATURE_NAMES)} features, got shape {values.shape}")
+        self.feature_vector = values.tobytes()
+
+    @property
+    def ml_features(self):
+        """V1-V28 as a {name: value} dict, for code written against the old JSON field"""
+        values = self.features_array
+        if values is None:
+            return {}
+        # NaN marks a feature that was never provided
+        return {name: value for name, value in zip(FEATURE_NAMES, values.tolist()) if value == value}
+
+    @ml_features.setter
+    def ml_features(self, features):
+        self.features_array = [float(features.get(name, np.nan)) for name in FEATURE_NAMES]
+
+    def as_dict(self):
+        """User-visible fields as returned by the API"""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp.isoformat(),
+            'amount': self.amount,
+            'location': self.location,
+            'description': self.description,
+            'is_fraud': self.is_fraud,
+            'fraud_probability': self.fraud_probability,
+            'created_at': self.created_at.isoformat()
+        }
 
     def __str__(self):
         return f"Transaction {self.id} - ${self.amount} - {'FRAUD' if self.is_fraud else 'LEGITIMATE'}"
+
+# Fraud probability histogram kept per rollup bucket: [0, 0.1), [0.1, 0.2), ..., [0.9, 1.0]
+PROBABILITY_BINS = 10
+
+class TransactionRollup(models.Model):
+    """Pre-aggregated transaction counts per minute or hour of transaction timestamp"""
+    GRANULARITY_CHOICES = [('minute', 'Minute'), ('hour', 'Hour')]
+
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    fraud_count = models.IntegerField(default=0)
+    amount_sum = models.FloatField(default=0.0)
+    fraud_amount_sum = models.FloatField(default=0.0)
+    # One counter per probability bin so every update is a plain F() increment
+    probability_bin_0 = models.IntegerField(default=0)
+    probability_bin_1 = models.IntegerField(default=0)
+    probability_bin_2 = models.IntegerField(default=0)
+    probability_bin_3 = models.IntegerField(default=0)
+    probability_bin_4 = models.IntegerField(default=0)
+    probability_bin_5 = models.IntegerField(default=0)
+    probability_bin_6 = models.IntegerField(default=0)
+    probability_bin_7 = models.IntegerField(default=0)
+    probability_bin_8 = models.IntegerField(default=0)
+    probability_bin_9 = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['granularity', 'bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket_start'], name='rollup_granularity_bucket_uniq'),
+        ]
+
+    @property
+    def probability_histogram(self):
+        return [getattr(self, f'probability_bin_{i}') for i in range(PROBABILITY_BINS)]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start.isoformat()}: {self.count} transactions, {self.fraud_count} fraud"
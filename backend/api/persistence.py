@@ -0,0 +1,134 @@
+import atexit
+import logging
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+from .models import Transaction
+from .caching import invalidate_transactions
+from .events import publish_transactions
+from .rollups import record_transactions
+
+logger = logging.getLogger(__name__)
+
+class TransactionWriter:
+    """
+    Persists scored transactions in 'sync' or 'buffered' (write-behind) mode.
+
+    In sync mode save() inserts before returning. In buffered mode save()
+    only appends to an in-memory buffer; a background thread writes it with
+    bulk_create once batch_size rows are pending or flush_interval seconds
+    have passed, and flush() runs at interpreter exit. Rows still buffered
+    when the process is killed are lost, so buffered mode trades durability
+    for latency. If max_pending rows pile up the caller writes them itself.
+    Either way the rollups are updated in the same database transaction and
+    a 'created' event is published once it commits.
+    """
+
+    def __init__(self, mode='sync', batch_size=500, flush_interval=1.0, max_pending=50000):
+        if mode not in ('sync', 'buffered'):
+            raise ValueError(f"Unknown persistence mode: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.failed = 0
+
+    def _write(self, transactions):
+        with db_transaction.atomic():
+            Transaction.objects.bulk_create(transactions, batch_size=self.batch_size)
+            record_transactions(transactions)
+            invalidate_transactions()
+            db_transaction.on_commit(lambda: publish_transactions('created', transactions))
+        self.written += len(transactions)
+
+    def save(self, transactions):
+        """Persist a list of unsaved Transaction objects according to the mode"""
+        if not transactions:
+            return
+        if self.mode == 'sync':
+            self._write(transactions)
+            return
+
+        self._ensure_worker()
+        with self._condition:
+            self._pending.extend(transactions)
+            pending = len(self._pending)
+            if pending >= self.batch_size:
+                self._condition.notify()
+        if pending >= self.max_pending:
+            self.flush()
+
+    async def asave(self, transactions):
+        """save() for async views; only sync mode (or a full buffer) touches the database"""
+        if not transactions:
+            return
+        if self.mode == 'sync':
+            await sync_to_async(self._write)(transactions)
+            return
+        with self._condition:
+            overflowing = len(self._pending) + len(transactions) >= self.max_pending
+        if overflowing:
+            await sync_to_async(self.save, thread_sensitive=False)(transactions)
+        else:
+            self.save(transactions)
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything buffered so far"""
+        with self._flush_lock:
+            with self._condition:
+                transactions, self._pending = self._pending, []
+            if not transactions:
+                return
+            try:
+                self._write(transactions)
+            except Exception:
+                self.failed += len(transactions)
+                logger.exception('Failed to write %s buffered transactions', len(transactions))
+
+    def _ensure_worker(self):
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='transaction-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            close_old_connections()
+            self.flush()
+
+_transaction_writer = None
+_transaction_writer_lock = threading.Lock()
+
+def get_transaction_writer():
+    """Process-wide TransactionWriter configured from FRAUD_PERSISTENCE_* settings"""
+    global _transaction_writer
+    if _transaction_writer is None:
+        with _transaction_writer_lock:
+            if _transaction_writer is None:
+                _transaction_writer = TransactionWriter(
+                    mode=settings.FRAUD_PERSISTENCE_MODE,
+                    batch_size=settings.FRAUD_PERSISTENCE_BATCH_SIZE,
+                    flush_interval=settings.FRAUD_PERSISTENCE_FLUSH_INTERVAL,
+                    max_pending=settings.FRAUD_PERSISTENCE_MAX_PENDING
+                )
+                atexit.register(_transaction_writer.flush)
+    return _transaction_writer
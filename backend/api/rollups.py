@@ -0,0 +1,172 @@
+"""
+Per-minute and per-hour aggregates of Transaction for the dashboard stats.
+
+Every code path that writes or re-scores transactions applies its deltas
+here inside the same database transaction, as F() increments, so the
+rollups stay in step with the Transaction table without ever scanning it:
+save() and delete() (views, admin, shell) through api.signals, bulk writes
+and re-scoring by calling record_* themselves. QuerySet.update()/delete()
+and loaddata bypass both; run manage.py rebuild_rollups after those.
+rebuild_rollups() recomputes them from scratch with one GROUP BY query per
+granularity.
+"""
+import bisect
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+import numpy as np
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour, TruncMinute
+from django.utils import timezone
+from .models import PROBABILITY_BINS, Transaction, TransactionRollup
+
+GRANULARITIES = {'minute': TruncMinute, 'hour': TruncHour}
+BIN_FIELDS = [f'probability_bin_{i}' for i in range(PROBABILITY_BINS)]
+BIN_EDGES = [i / PROBABILITY_BINS for i in range(PROBABILITY_BINS)]
+COUNTER_FIELDS = ['count', 'fraud_count', 'amount_sum', 'fraud_amount_sum'] + BIN_FIELDS
+
+def probability_bin(probability):
+    """Histogram bin of a fraud probability, using the same ranges rebuild_rollups counts in SQL"""
+    return min(max(bisect.bisect_right(BIN_EDGES, probability) - 1, 0), PROBABILITY_BINS - 1)
+
+def bucket_start(timestamp, granularity):
+    """Start of the UTC minute or hour containing timestamp"""
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+def _deltas(rows):
+    """Sum (timestamp, amount, is_fraud, probability, sign) rows into per-bucket counter deltas"""
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for timestamp, amount, is_fraud, probability, sign in rows:
+        for granularity in GRANULARITIES:
+            delta = deltas[granularity, bucket_start(timestamp, granularity)]
+            delta['count'] += sign
+            delta['amount_sum'] += sign * amount
+            if is_fraud:
+                delta['fraud_count'] += sign
+                delta['fraud_amount_sum'] += sign * amount
+            delta[BIN_FIELDS[probability_bin(probability)]] += sign
+    return deltas
+
+def _apply(deltas):
+    if not deltas:
+        return
+    with db_transaction.atomic():
+        # Make sure every bucket exists, then increment in place so concurrent writers never lose updates
+        TransactionRollup.objects.bulk_create(
+            [TransactionRollup(granularity=granularity, bucket_start=start) for granularity, start in deltas],
+            ignore_conflicts=True
+        )
+        # Sorted so concurrent writers lock buckets in the same order
+        for (granularity, start), delta in sorted(deltas.items()):
+            changes = {field: F(field) + value for field, value in delta.items() if value}
+            if changes:
+                TransactionRollup.objects.filter(granularity=granularity, bucket_start=start).update(**changes)
+
+def record_transactions(transactions):
+    """Add newly written transactions to the rollups"""
+    _apply(_deltas(
+        (t.timestamp, t.amount, t.is_fraud, t.fraud_probability, 1) for t in transactions
+    ))
+
+def remove_transactions(transactions):
+    """Take deleted transactions out of the rollups"""
+    _apply(_deltas(
+        (t.timestamp, t.amount, t.is_fraud, t.fraud_probability, -1) for t in transactions
+    ))
+
+def record_update(transaction, previous):
+    """Move a saved transaction whose (timestamp, amount, is_fraud, fraud_probability) used to be previous"""
+    current = (transaction.timestamp, transaction.amount, transaction.is_fraud, transaction.fraud_probability)
+    if tuple(previous) == current:
+        return
+    _apply(_deltas([(*previous, -1), (*current, 1)]))
+
+def record_columns(timestamps, amounts, is_fraud, probabilities):
+    """
+    record_transactions() for column arrays, e.g. a chunk of a bulk import.
+
+    timestamps are datetime64 values in UTC; the buckets are computed with
+    NumPy instead of one datetime at a time.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+    amounts = np.asarray(amounts, dtype=np.float64)
+    is_fraud = np.asarray(is_fraud, dtype=bool)
+    bins = np.clip(np.searchsorted(BIN_EDGES, np.asarray(probabilities), side='right') - 1, 0, PROBABILITY_BINS - 1)
+
+    deltas = {}
+    for granularity, unit in (('minute', 'm'), ('hour', 'h')):
+        buckets, index = np.unique(timestamps.astype(f'datetime64[{unit}]'), return_inverse=True)
+        n = len(buckets)
+        counts = np.bincount(index, minlength=n)
+        fraud_counts = np.bincount(index, weights=is_fraud, minlength=n)
+        amount_sums = np.bincount(index, weights=amounts, minlength=n)
+        fraud_amount_sums = np.bincount(index, weights=amounts * is_fraud, minlength=n)
+        histograms = np.zeros((n, PROBABILITY_BINS), dtype=np.int64)
+        np.add.at(histograms, (index, bins), 1)
+        for i, bucket in enumerate(buckets.astype('datetime64[us]').tolist()):
+            delta = {
+                'count': int(counts[i]),
+                'fraud_count': int(fraud_counts[i]),
+                'amount_sum': float(amount_sums[i]),
+                'fraud_amount_sum': float(fraud_amount_sums[i]),
+            }
+            delta.update(zip(BIN_FIELDS, histograms[i].tolist()))
+            deltas[granularity, bucket.replace(tzinfo=dt_timezone.utc)] = delta
+    _apply(deltas)
+
+def record_rescores(changes):
+    """
+    Move re-scored transactions, given as (transaction, previous_is_fraud,
+    previous_probability), from their old fraud flag and probability bin to
+    the new ones.
+    """
+    rows = []
+    for t, previous_is_fraud, previous_probability in changes:
+        if t.is_fraud == previous_is_fraud and probability_bin(t.fraud_probability) == probability_bin(previous_probability):
+            continue
+        rows.append((t.timestamp, t.amount, previous_is_fraud, previous_probability, -1))
+        rows.append((t.timestamp, t.amount, t.is_fraud, t.fraud_probability, 1))
+    _apply(_deltas(rows))
+
+def _bin_filter(index):
+    condition = Q()
+    if index > 0:
+        condition &= Q(fraud_probability__gte=BIN_EDGES[index])
+    if index < PROBABILITY_BINS - 1:
+        condition &= Q(fraud_probability__lt=BIN_EDGES[index + 1])
+    return condition
+
+def rebuild_rollups(granularities=None):
+    """Recompute the rollups from the Transaction table; returns the number of buckets written"""
+    fraud = Q(is_fraud=True)
+    aggregates = {
+        'count': Count('id'),
+        'fraud_count': Count('id', filter=fraud),
+        'amount_sum': Coalesce(Sum('amount'), Value(0.0)),
+        'fraud_amount_sum': Coalesce(Sum('amount', filter=fraud), Value(0.0)),
+    }
+    aggregates.update({field: Count('id', filter=_bin_filter(i)) for i, field in enumerate(BIN_FIELDS)})
+
+    written = 0
+    with db_transaction.atomic():
+        for granularity in granularities or GRANULARITIES:
+            truncate = GRANULARITIES[granularity]
+            rows = (
+                Transaction.objects.order_by()
+                .annotate(bucket=truncate('timestamp', tzinfo=dt_timezone.utc))
+                .values('bucket')
+                .annotate(**aggregates)
+            )
+            TransactionRollup.objects.filter(granularity=granularity).delete()
+            rollups = [
+                TransactionRollup(granularity=granularity, bucket_start=row.pop('bucket'), **row)
+                for row in rows
+            ]
+            TransactionRollup.objects.bulk_create(rollups, batch_size=1000)
+            written += len(rollups)
+    return written
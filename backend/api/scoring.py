@@ -0,0 +1,191 @@
+import numpy as np
+
+class ScoringEngine:
+    """
+    Logistic regression scorer with the StandardScaler folded into the weights.
+
+    sigmoid(((x - mean) / scale) . coef + intercept) is rewritten as
+    sigmoid(x . w + b) with w = coef / scale and b = intercept - (mean / scale) . coef,
+    so scaling, probability and decision come out of one dot product per row
+    without going through sklearn's input validation.
+    """
+
+    def __init__(self, mean, scale, coef, intercept, threshold=0.5, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(np.ravel(intercept)[0])
+        self.threshold = float(threshold)
+
+        self.weights = (self.coef / self.scale).astype(self.dtype)
+        self.bias = self.dtype.type(self.intercept - np.dot(self.mean / self.scale, self.coef))
+        self.contribution_offset = (self.mean * self.coef / self.scale).astype(self.dtype)
+
+        # Compare logits instead of probabilities: p > t  <=>  z > log(t / (1 - t))
+        with np.errstate(divide='ignore'):
+            self.logit_threshold = float(np.log(self.threshold) - np.log1p(-self.threshold))
+
+    @classmethod
+    def from_sklearn(cls, scaler, model, threshold=0.5, dtype=np.float64):
+        """Compile a fitted StandardScaler and binary LogisticRegression"""
+        n_features = model.coef_.shape[1]
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        return cls(mean, scale, model.coef_[0], model.intercept_, threshold, dtype)
+
+    def astype(self, dtype):
+        """Return the same engine computing in another float dtype"""
+        return type(self)(self.mean, self.scale, self.coef, self.intercept, self.threshold, dtype)
+
+    def decision_function(self, features):
+        """Logits for an N x F (or F) array of unscaled features"""
+        return np.asarray(features, dtype=self.dtype) @ self.weights + self.bias
+
+    def score(self, features):
+        """Return (fraud probabilities, fraud decisions) for unscaled features"""
+        logits = self.decision_function(features)
+        # Numerically stable sigmoid: 1 / (1 + exp(-z)) == exp(-log(1 + exp(-z)))
+        probabilities = np.exp(-np.logaddexp(0, -logits))
+        return probabilities, logits > self.logit_threshold
+
+    def contributions(self, features):
+        """Per-feature logit contributions coef * (x - mean) / scale for an N x F array"""
+        return np.asarray(features, dtype=self.dtype) * self.weights - self.contribution_offset
+
+def top_contributions(contributions, feature_names, top_k=5):
+    """
+    Top-k features by absolute contribution for every row of an N x F array,
+    largest first, as lists of {'feature', 'contribution'} dicts.
+    """
+    contributions = np.atleast_2d(contributions)
+    top_k = min(top_k, contributions.shape[1])
+    if top_k <= 0:
+        return [[] for _ in contributions]
+
+    # argpartition finds the k largest in O(F), only those k get sorted
+    magnitudes = np.abs(contributions)
+    top = np.argpartition(-magnitudes, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(magnitudes, top, axis=1), axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    values = np.take_along_axis(contributions, top, axis=1)
+
+    return [
+        [{'feature': feature_names[j], 'contribution': float(v)} for j, v in zip(row_top, row_values)]
+        for row_top, row_values in zip(top.tolist(), values.tolist())
+    ]
+
+# Fallback limits for models trained before feature_bounds were stored in metadata
+DEFAULT_FEATURE_LIMIT = 100
+DEFAULT_AMOUNT_RANGE = (0, 25000)
+
+class FeatureValidator:
+    """
+    Validator compiled once from the model schema.
+
+    Converts feature payloads into rows of an array ordered like
+    feature_names and checks every value against its (lower, upper) bound
+    with a single vectorized mask. Amount must always be positive.
+    """
+
+    def __init__(self, feature_names, feature_bounds=None):
+        self.feature_names = list(feature_names)
+        self.feature_set = frozenset(self.feature_names)
+        self.amount_index = self.feature_names.index('Amount') if 'Amount' in self.feature_set else None
+
+        bounds = [
+            (feature_bounds or {}).get(name) or (
+                DEFAULT_AMOUNT_RANGE if name == 'Amount' else (-DEFAULT_FEATURE_LIMIT, DEFAULT_FEATURE_LIMIT)
+            )
+            for name in self.feature_names
+        ]
+        self.lower = np.array([lower for lower, _ in bounds], dtype=np.float64)
+        self.upper = np.array([upper for _, upper in bounds], dtype=np.float64)
+
+        if self.amount_index is not None:
+            # The amount range is exclusive at 0: x < nextafter(0, 1)  <=>  x <= 0
+            self.amount_range = (max(self.lower[self.amount_index], 0), self.upper[self.amount_index])
+            self.lower[self.amount_index] = max(self.lower[self.amount_index], np.nextafter(0, 1))
+
+    def _schema_errors(self, features_dict):
+        errors = []
+        missing_features = [name for name in self.feature_names if name not in features_dict]
+        extra_features = [name for name in features_dict if name not in self.feature_set]
+        if missing_features:
+            errors.append(f"Missing features: {', '.join(missing_features)}")
+        if extra_features:
+            errors.append(f"Extra features not used by model: {', '.join(map(str, extra_features))}")
+        return errors
+
+    def _value_error(self, index, value):
+        name = self.feature_names[index]
+        if index == self.amount_index:
+            lower, upper = self.amount_range
+            return f"Amount {value} is outside reasonable range ({lower:g}-{upper:g})"
+        return f"Feature {name} has unusually large value: {value}"
+
+    def _convert_row(self, features_dict, out):
+        """Fill out from features_dict one value at a time, returning conversion errors"""
+        errors = []
+        for index, name in enumerate(self.feature_names):
+            if name not in features_dict:
+                out[index] = np.nan
+                continue
+            value = features_dict[name]
+            try:
+                out[index] = float(value)
+            except (TypeError, ValueError):
+                out[index] = np.nan
+            # NaN and infinity (JSON accepts both) are invalid, not merely out of range
+            if not np.isfinite(out[index]):
+                out[index] = np.nan
+                errors.append(f"Feature {name} has invalid value: {value}")
+        return errors
+
+    def validate_batch(self, features_list):
+        """
+        Convert a list of feature dicts into an N x F float64 array.
+
+        Returns (features, errors) where errors[i] lists the messages for row i.
+        Rows with errors contain NaN in place of missing or invalid values.
+        """
+        features = np.empty((len(features_list), len(self.feature_names)), dtype=np.float64)
+        errors = [[] for _ in features_list]
+
+        for row, features_dict in enumerate(features_list):
+            if not isinstance(features_dict, dict):
+                features[row] = np.nan
+                errors[row].append("expected an object of features")
+                continue
+            if features_dict.keys() != self.feature_set:
+                errors[row].extend(self._schema_errors(features_dict))
+            try:
+                features[row] = [features_dict.get(name, np.nan) for name in self.feature_names]
+            except (TypeError, ValueError):
+                errors[row].extend(self._convert_row(features_dict, features[row]))
+
+        # Non-finite here is a missing key, a value numpy quietly turned into NaN (None), or a NaN/inf payload
+        for row in np.flatnonzero(~np.isfinite(features).all(axis=1)):
+            if isinstance(features_list[row], dict) and not errors[row]:
+                errors[row].extend(self._convert_row(features_list[row], features[row]))
+
+        # Check every bound of every row at once
+        out_of_range = (features < self.lower) | (features > self.upper)
+        for row, index in zip(*np.nonzero(out_of_range)):
+            errors[row].append(self._value_error(index, float(features[row, index])))
+
+        return features, errors
+
+    def validate(self, features_dict):
+        """Return (ordered feature array, errors) for a single payload"""
+        # Fast path for the common case: the exact schema, finite values, all in range
+        if isinstance(features_dict, dict) and features_dict.keys() == self.feature_set:
+            try:
+                features = np.array([features_dict[name] for name in self.feature_names], dtype=np.float64)
+            except (TypeError, ValueError):
+                pass
+            else:
+                if np.isfinite(features).all() and not ((features < self.lower) | (features > self.upper)).any():
+                    return features, []
+        features, errors = self.validate_batch([features_dict])
+        return features[0], errors[0]
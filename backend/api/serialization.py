@@ -0,0 +1,99 @@
+"""
+JSON encoding for API responses.
+
+Uses orjson when it is installed (it serializes datetimes and NumPy values
+natively, in C) and the standard library otherwise. Large lists are
+encoded a chunk of rows at a time and streamed, so neither the rows nor
+the encoded body have to fit in memory at once.
+"""
+import datetime
+import json
+import numpy as np
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Transaction columns returned by the API, in the order of Transaction.as_dict()
+TRANSACTION_FIELDS = (
+    'id', 'timestamp', 'amount', 'location', 'description', 'is_fraud', 'fraud_probability', 'created_at'
+)
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Encode obj as UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj):
+        """Encode obj as UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode()
+
+def json_response(data, status=200):
+    """JsonResponse equivalent using the fast encoder"""
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+def encode_items(items, first):
+    """Comma-separated JSON for a list of items, to be placed inside an array"""
+    body = dumps(items)[1:-1]
+    if not body or first:
+        return body
+    return b',' + body
+
+def chunked(items, chunk_size):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+async def astream_object(head, key, items, tail=None, chunk_size=500):
+    """
+    Yield {**head, key: [*items], **tail()} as JSON, chunk_size items at a time.
+
+    items may be a list or an async iterable of lists (e.g. database
+    chunks); tail is called after the last item, so it can report on them.
+    """
+    prefix = dumps(head)[:-1]
+    yield prefix + (b',' if len(prefix) > 1 else b'') + dumps(key) + b':['
+
+    first = True
+    if isinstance(items, list):
+        for chunk in chunked(items, chunk_size):
+            yield encode_items(chunk, first)
+            first = False
+    else:
+        async for chunk in items:
+            if chunk:
+                yield encode_items(chunk, first)
+                first = False
+
+    suffix = dumps(tail() if tail is not None else {})[1:]
+    yield b']' + (b',' if len(suffix) > 1 else b'') + suffix
+
+def streaming_json_response(chunks, status=200):
+    return StreamingHttpResponse(chunks, content_type='application/json', status=status)
+
+async def arow_chunks(queryset, fields, chunk_size=500):
+    """Row dicts from queryset.values(*fields), in lists of at most chunk_size rows"""
+    chunk = []
+    # values() rather than values_list(): Django's async iterator for values_list()
+    # runs its query before switching to a thread
+    async for row in queryset.values(*fields).aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
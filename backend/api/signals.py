@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .caching import invalidate_transactions
+from .models import Transaction
+from .rollups import record_transactions, record_update, remove_transactions
+
+ROLLUP_FIELDS = ('timestamp', 'amount', 'is_fraud', 'fraud_probability')
+
+# Covers save() and delete() from views, the admin and the shell; bulk writes
+# (which send no signals) update the rollups and call invalidate_transactions() themselves.
+# Fixtures (raw saves) are left out of the rollups, rebuild them after loaddata.
+@receiver(pre_save, sender=Transaction)
+def remember_rollup_fields(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk is not None and not raw:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_rollup_previous', None)
+        if previous is None:
+            record_transactions([instance])
+        else:
+            record_update(instance, previous)
+    invalidate_transactions()
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    remove_transactions([instance])
+    invalidate_transactions()
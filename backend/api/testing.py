@@ -0,0 +1,20 @@
+"""
+Synthetic data shared by the test suite and the benchmarks.
+"""
+import numpy as np
+import pandas as pd
+
+FEATURE_NAMES = [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+def write_synthetic_dataset(path, n_rows=600, fraud_rate=0.1, seed=0):
+    """Write a creditcard.csv look-alike with a learnable fraud signal"""
+    rng = np.random.default_rng(seed)
+    is_fraud = rng.random(n_rows) < fraud_rate
+    df = pd.DataFrame(rng.normal(0, 1, size=(n_rows, 28)), columns=FEATURE_NAMES[:-1])
+    df.loc[is_fraud, ['V4', 'V11']] += 3
+    df.loc[is_fraud, ['V14', 'V12']] -= 3
+    df.insert(0, 'Time', np.arange(n_rows, dtype=float))
+    df['Amount'] = rng.uniform(1, 500, n_rows).round(2)
+    df['Class'] = is_fraud.astype(int)
+    df.to_csv(path, index=False)
+    return df
@@ -1,7 +1,81 @@
-from django.test import TestCase, Client
+from django.test import TestCase, SimpleTestCase, Client
+from django.core.management import call_command
 from django.urls import reverse
-from .models import Transaction
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.core.cache import cache
+from django.conf import settings
+from django.apps import apps as django_apps
+from .models import Transaction, TransactionRollup
+from .rollups import rebuild_rollups
+from . import ml_fraud_model, ml_training, model_artifact
+from .dataset_cache import open_dataset
+from .batching import MicroBatcher
+from .events import TransactionEventBroker
+from .persistence import TransactionWriter
+from .training_job import FileLock, start_background_training
+from .serialization import astream_object
+from .utils import clean_data, extract_top_features
+from .testing import FEATURE_NAMES, write_synthetic_dataset
+from .timing import Histogram, reset_timing_stats, span, timing_stats
+from .scoring import FeatureValidator, ScoringEngine, top_contributions
+from unittest import mock
+from asgiref.sync import async_to_sync
+import asyncio
+from datetime import datetime, timedelta
+import contextlib
+import gc
+import importlib
+import io
 import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import threading
+import warnings
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+API_KEY = 'your-test-api-key-123'
+
+def train_synthetic_model(workdir, **kwargs):
+    """Train the fraud model on synthetic data into workdir/models"""
+    data_path = os.path.join(workdir, 'creditcard.csv')
+    model_dir = os.path.join(workdir, 'models')
+    write_synthetic_dataset(data_path, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ml_training.train_fraud_model(data_path=data_path, model_dir=model_dir)
+    return model_dir
+
+def response_body(response):
+    """Body of a plain or streamed (sync or async) response"""
+    if not response.streaming:
+        return response.content
+    if response.is_async:
+        async def consume():
+            return b''.join([part async for part in response.streaming_content])
+        return async_to_sync(consume)()
+    return b''.join(response.streaming_content)
+
+def response_json(response):
+    return json.loads(response_body(response))
+
+async def aresponse_json(response):
+    if response.streaming and response.is_async:
+        return json.loads(b''.join([part async for part in response.streaming_content]))
+    return json.loads(response_body(response))
+
+def sample_transaction(**overrides):
+    features = {name: 0.1 for name in FEATURE_NAMES}
+    features['Amount'] = 42.0
+    features.update(overrides)
+    return features
 
 class TransactionAPITests(TestCase):
     def setUp(self):
@@ -60,3 +134,1169 @@ class TransactionAPITests(TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.content)
         self.assertTrue('model_info' in data)
+
+class TrainedModelMixin:
+    """Train a synthetic model once per class and serve it from the model cache"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.workdir = tempfile.mkdtemp()
+        cls.model_dir = train_synthetic_model(cls.workdir)
+        cls.model_cache = ml_fraud_model.ModelCache(cls.model_dir)
+        cls.cache_patcher = mock.patch.object(ml_fraud_model, '_model_cache', cls.model_cache)
+        cls.cache_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache_patcher.stop()
+        shutil.rmtree(cls.workdir)
+        super().tearDownClass()
+
+class ModelCacheTests(TrainedModelMixin, SimpleTestCase):
+
+    def make_cache(self, model_dir=None):
+        return ml_fraud_model.ModelCache(model_dir or self.model_dir, check_interval=0, settle_time=0)
+
+    def copy_model_dir(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        return shutil.copytree(self.model_dir, os.path.join(workdir, 'models'))
+
+    def test_serves_bundle_from_memory(self):
+        cache = self.make_cache()
+        bundle = cache.get()
+        with mock.patch('joblib.load') as joblib_load:
+            self.assertIs(cache.get(), bundle)
+        joblib_load.assert_not_called()
+
+    def test_swaps_in_new_version_when_artifacts_change(self):
+        model_dir = self.copy_model_dir()
+        cache = self.make_cache(model_dir)
+        bundle = cache.get()
+        arrays, metadata = model_artifact.load_artifact(model_dir)
+        _, manifest_path = model_artifact.save_artifact(model_dir, arrays, dict(metadata, threshold=0.7))
+        os.utime(manifest_path, (0, 0))
+
+        reloaded = cache.get()
+        self.assertEqual(reloaded.version, bundle.version + 1)
+        self.assertEqual(reloaded.metadata['threshold'], 0.7)
+
+    def test_keeps_serving_previous_version_if_reload_fails(self):
+        model_dir = self.copy_model_dir()
+        cache = self.make_cache(model_dir)
+        bundle = cache.get()
+        arrays_path, _ = model_artifact.artifact_files(model_dir)
+        with open(arrays_path, 'wb') as f:
+            f.write(b'not an npz')
+
+        with self.assertLogs('api.ml_fraud_model', level='ERROR'):
+            self.assertIs(cache.get(), bundle)
+
+class ModelArtifactTests(TrainedModelMixin, SimpleTestCase):
+    def copy_model_dir(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        return shutil.copytree(self.model_dir, os.path.join(workdir, 'models'))
+
+    def test_loads_without_unpickling(self):
+        with mock.patch('joblib.load') as joblib_load:
+            bundle = ml_fraud_model.ModelCache(self.model_dir, auto_train=False).get()
+        joblib_load.assert_not_called()
+        self.assertIsNone(bundle.model)
+        self.assertEqual(bundle.metadata['feature_names'], FEATURE_NAMES)
+        self.assertIsInstance(bundle.metadata['feature_bounds']['V1'], tuple)
+
+    def test_artifact_scores_like_the_pickles(self):
+        model_dir = self.copy_model_dir()
+        for path in model_artifact.artifact_files(model_dir):
+            os.remove(path)
+        from_pickles = ml_fraud_model.ModelCache(model_dir, auto_train=False).get()
+        self.assertIsNotNone(from_pickles.model)
+
+        out = io.StringIO()
+        call_command('convert_model', model_dir=model_dir, stdout=out)
+        self.assertTrue(model_artifact.artifact_exists(model_dir))
+        from_artifact = ml_fraud_model.ModelCache(model_dir, auto_train=False).get()
+        self.assertIsNone(from_artifact.model)
+        self.assertEqual(from_artifact.metadata['training_date'], from_pickles.metadata['training_date'])
+
+        features = np.random.default_rng(5).normal(0, 1, size=(100, len(FEATURE_NAMES)))
+        for expected, actual in zip(from_pickles.engine.score(features), from_artifact.engine.score(features)):
+            np.testing.assert_array_equal(expected, actual)
+
+    def test_rejects_arrays_that_fail_the_checksum(self):
+        model_dir = self.copy_model_dir()
+        arrays, metadata = model_artifact.load_artifact(model_dir)
+        arrays_path, _ = model_artifact.artifact_files(model_dir)
+        tampered = dict(arrays, coef=arrays['coef'] * 2)
+        np.save(arrays_path, np.concatenate([tampered[name] for name in model_artifact.ARRAY_NAMES]))
+        with self.assertRaisesMessage(model_artifact.ArtifactError, 'Checksum mismatch'):
+            model_artifact.load_artifact(model_dir)
+
+    def test_arrays_are_memory_mapped(self):
+        arrays, _ = model_artifact.load_artifact(self.model_dir)
+        for array in arrays.values():
+            self.assertIsInstance(array.base, np.memmap)
+            self.assertFalse(array.flags.writeable)
+
+    def test_version_1_directories_fall_back_to_the_pickles(self):
+        model_dir = self.copy_model_dir()
+        arrays_path, _ = model_artifact.artifact_files(model_dir)
+        os.rename(arrays_path, os.path.join(model_dir, 'fraud_model.npz'))
+        self.assertFalse(model_artifact.artifact_exists(model_dir))
+        self.assertIsNotNone(ml_fraud_model.ModelCache(model_dir, auto_train=False).get().model)
+
+    def test_rejects_unknown_versions(self):
+        model_dir = self.copy_model_dir()
+        _, manifest_path = model_artifact.artifact_files(model_dir)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        with open(manifest_path, 'w') as f:
+            json.dump(dict(manifest, format_version=99), f)
+        with self.assertRaises(model_artifact.ArtifactError):
+            model_artifact.load_artifact(model_dir)
+
+class BatchPredictionTests(TrainedModelMixin, TestCase):
+    def test_batch_matches_single_predictions(self):
+        transactions = [sample_transaction(V14=-3.0, V4=3.0), sample_transaction(Amount=250.0)]
+        batch = ml_fraud_model.predict_fraud_batch(transactions)
+        self.assertEqual(len(batch), 2)
+        for features, result in zip(transactions, batch):
+            single = ml_fraud_model.predict_fraud(features)
+            self.assertEqual(result['is_fraud'], single['is_fraud'])
+            self.assertAlmostEqual(result['fraud_probability'], single['fraud_probability'])
+            self.assertEqual(result['top_contributing_features'], single['top_contributing_features'])
+
+    def test_batch_reports_errors_per_transaction(self):
+        with self.assertRaisesMessage(ValueError, 'Transaction 1: Amount -5.0 is outside'):
+            ml_fraud_model.predict_fraud_batch([sample_transaction(), sample_transaction(Amount=-5.0)])
+
+    def test_batch_endpoint_scores_and_saves_transactions(self):
+        response = self.client.post(
+            reverse('predict_fraud_batch'),
+            data=json.dumps({'transactions': [sample_transaction() for _ in range(25)]}),
+            content_type='application/json',
+            HTTP_X_API_KEY=API_KEY
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response_json(response)
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['predictions']), 25)
+        self.assertEqual(Transaction.objects.count(), 25)
+
+    def test_endpoints_reject_nan_features(self):
+        # json.dumps writes NaN, which json.loads reads back as float('nan')
+        nan_transaction = sample_transaction(V3=float('nan'))
+        for url, payload in (
+            (reverse('predict_fraud'), nan_transaction),
+            (reverse('predict_fraud_batch'), [sample_transaction(), nan_transaction]),
+        ):
+            response = self.client.post(url, data=json.dumps(payload), content_type='application/json',
+                                        HTTP_X_API_KEY=API_KEY)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Feature V3 has invalid value: nan', response_json(response)['error'])
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_batch_endpoint_rejects_oversized_batches(self):
+        with self.settings(FRAUD_BATCH_MAX_SIZE=2):
+            response = self.client.post(
+                reverse('predict_fraud_batch'),
+                data=json.dumps([sample_transaction() for _ in range(3)]),
+                content_type='application/json',
+                HTTP_X_API_KEY=API_KEY
+            )
+        self.assertEqual(response.status_code, 413)
+
+class ScoringEngineTests(TrainedModelMixin, SimpleTestCase):
+    def setUp(self):
+        self.model, self.scaler, _ = ml_fraud_model.load_model()
+        self.features = np.random.default_rng(1).normal(0, 2, size=(200, len(FEATURE_NAMES)))
+        self.features[:, -1] = np.abs(self.features[:, -1]) * 100
+
+    def test_matches_sklearn_in_float64(self):
+        engine = ScoringEngine.from_sklearn(self.scaler, self.model)
+        probabilities, is_fraud = engine.score(self.features)
+        scaled = self.scaler.transform(self.features)
+        np.testing.assert_allclose(probabilities, self.model.predict_proba(scaled)[:, 1], rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(is_fraud, self.model.predict(scaled).astype(bool))
+
+    def test_matches_sklearn_in_float32(self):
+        engine = ScoringEngine.from_sklearn(self.scaler, self.model, dtype=np.float32)
+        probabilities, _ = engine.score(self.features)
+        self.assertEqual(probabilities.dtype, np.float32)
+        scaled = self.scaler.transform(self.features)
+        np.testing.assert_allclose(probabilities, self.model.predict_proba(scaled)[:, 1], rtol=0, atol=1e-4)
+
+    def test_threshold_applies_to_decision(self):
+        engine = ScoringEngine.from_sklearn(self.scaler, self.model, threshold=0.9)
+        probabilities, is_fraud = engine.score(self.features)
+        np.testing.assert_array_equal(is_fraud, probabilities > 0.9)
+
+class FeatureValidatorTests(SimpleTestCase):
+    def setUp(self):
+        self.validator = FeatureValidator(FEATURE_NAMES)
+
+    def test_valid_payload_is_ordered_array(self):
+        features, errors = self.validator.validate(sample_transaction(V3='1.5', Amount=10))
+        self.assertEqual(errors, [])
+        self.assertEqual(features.shape, (len(FEATURE_NAMES),))
+        self.assertEqual(features[2], 1.5)
+        self.assertEqual(features[-1], 10.0)
+
+    def test_reports_schema_and_value_errors(self):
+        features = sample_transaction(V1=150, V2='abc', Amount=0, Extra=1)
+        del features['V28']
+        _, errors = self.validator.validate(features)
+        self.assertEqual(errors, [
+            'Missing features: V28',
+            'Extra features not used by model: Extra',
+            'Feature V2 has invalid value: abc',
+            'Feature V1 has unusually large value: 150.0',
+            'Amount 0.0 is outside reasonable range (0-25000)',
+        ])
+
+    def test_none_is_an_invalid_value(self):
+        _, errors = self.validator.validate(sample_transaction(V5=None))
+        self.assertEqual(errors, ['Feature V5 has invalid value: None'])
+
+    def test_non_finite_values_are_invalid(self):
+        _, errors = self.validator.validate(sample_transaction(V5=float('nan'), Amount=float('inf')))
+        self.assertEqual(errors, ['Feature V5 has invalid value: nan', 'Feature Amount has invalid value: inf'])
+        _, errors = self.validator.validate(sample_transaction(V5='NaN'))
+        self.assertEqual(errors, ['Feature V5 has invalid value: NaN'])
+
+    def test_batch_rejects_non_finite_rows_only(self):
+        _, errors = self.validator.validate_batch([sample_transaction(), sample_transaction(V7=float('nan'))])
+        self.assertEqual(errors, [[], ['Feature V7 has invalid value: nan']])
+
+    def test_batch_collects_errors_per_row(self):
+        features, errors = self.validator.validate_batch(
+            [sample_transaction(), 'oops', sample_transaction(Amount=30000)]
+        )
+        self.assertEqual(features.shape, (3, len(FEATURE_NAMES)))
+        self.assertEqual(errors[0], [])
+        self.assertEqual(errors[1], ['expected an object of features'])
+        self.assertEqual(errors[2], ['Amount 30000.0 is outside reasonable range (0-25000)'])
+
+    def test_uses_learned_bounds(self):
+        validator = FeatureValidator(['V1', 'Amount'], {'V1': (-2.0, 2.0), 'Amount': (-10.0, 500.0)})
+        _, errors = validator.validate({'V1': 3.0, 'Amount': 600})
+        self.assertEqual(errors, [
+            'Feature V1 has unusually large value: 3.0',
+            'Amount 600.0 is outside reasonable range (0-500)',
+        ])
+        _, errors = validator.validate({'V1': 1.0, 'Amount': 0})
+        self.assertEqual(errors, ['Amount 0.0 is outside reasonable range (0-500)'])
+
+    def test_training_stores_feature_bounds(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        metadata = ml_fraud_model.ModelCache(train_synthetic_model(workdir)).get().metadata
+        self.assertEqual(list(metadata['feature_bounds']), FEATURE_NAMES)
+        lower, upper = metadata['feature_bounds']['V1']
+        self.assertLess(lower, -3)
+        self.assertGreater(upper, 3)
+
+class ExplanationTests(TrainedModelMixin, TestCase):
+    def test_contributions_use_scaled_inputs(self):
+        bundle = self.model_cache.get()
+        model, scaler, _ = ml_fraud_model.load_model()
+        features = np.random.default_rng(2).normal(0, 1, size=(10, len(FEATURE_NAMES)))
+        expected = (features - scaler.mean_) / scaler.scale_ * model.coef_[0]
+        np.testing.assert_allclose(bundle.engine.contributions(features), expected, atol=1e-12)
+
+    def test_top_contributions_match_full_sort(self):
+        contributions = np.random.default_rng(3).normal(0, 1, size=(50, 29))
+        names = [f'f{i}' for i in range(29)]
+        for row, top in zip(contributions, top_contributions(contributions, names, top_k=5)):
+            expected = sorted(range(29), key=lambda j: abs(row[j]), reverse=True)[:5]
+            self.assertEqual([item['feature'] for item in top], [names[j] for j in expected])
+            self.assertEqual([item['contribution'] for item in top], [row[j] for j in expected])
+
+    def test_extract_top_features_matches_predictions(self):
+        bundle = self.model_cache.get()
+        transaction = sample_transaction(V14=-3.0, V4=3.0)
+        features, _ = bundle.validator.validate(transaction)
+        self.assertEqual(
+            extract_top_features(bundle.engine, bundle.metadata['feature_names'], features),
+            ml_fraud_model.predict_fraud(transaction)['top_contributing_features']
+        )
+
+    def test_extract_top_features_accepts_a_fitted_model(self):
+        model, scaler, metadata = ml_fraud_model.load_model()
+        transaction = sample_transaction(V14=-3.0, V4=3.0)
+        features, _ = self.model_cache.get().validator.validate(transaction)
+        self.assertEqual(
+            extract_top_features(model, metadata['feature_names'], features, scaler=scaler),
+            ml_fraud_model.predict_fraud(transaction)['top_contributing_features']
+        )
+        # Without the scaler, row_data is taken as already scaled
+        scaled = scaler.transform([features])[0]
+        self.assertEqual(
+            [item['feature'] for item in extract_top_features(model, metadata['feature_names'], scaled)],
+            [item['feature'] for item in ml_fraud_model.predict_fraud(transaction)['top_contributing_features']]
+        )
+
+    def test_explanations_can_be_skipped(self):
+        result = ml_fraud_model.predict_fraud(sample_transaction(), explain=False)
+        self.assertNotIn('top_contributing_features', result)
+        self.assertEqual(len(ml_fraud_model.predict_fraud(sample_transaction())['top_contributing_features']), 5)
+
+    def test_batch_endpoint_honours_explain_flag(self):
+        response = self.client.post(
+            reverse('predict_fraud_batch') + '?explain=0',
+            data=json.dumps([sample_transaction()]),
+            content_type='application/json',
+            HTTP_X_API_KEY=API_KEY
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('top_contributing_features', response_json(response)['predictions'][0])
+
+class StreamingTrainingTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.data_path = os.path.join(self.workdir, 'creditcard.csv')
+        write_synthetic_dataset(self.data_path, n_rows=3000, seed=4)
+
+    def test_streaming_model_is_servable(self):
+        model_dir = os.path.join(self.workdir, 'models')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ml_training.train_fraud_model_streaming(self.data_path, model_dir, chunksize=250, epochs=3)
+        bundle = ml_fraud_model.ModelCache(model_dir).get()
+        self.assertEqual(bundle.metadata['feature_names'], FEATURE_NAMES)
+        self.assertEqual(set(bundle.metadata['feature_bounds']), set(FEATURE_NAMES))
+
+        df = pd.read_csv(self.data_path)
+        probabilities, _ = bundle.engine.score(df[FEATURE_NAMES].to_numpy())
+        self.assertGreater(roc_auc_score(df['Class'], probabilities), 0.95)
+
+    def test_split_is_identical_across_passes(self):
+        def test_rows():
+            return [len(X_test) for _, _, X_test, _ in
+                    ml_training._iter_split_chunks(self.data_path, 400, 0.2, 42)]
+        self.assertEqual(test_rows(), test_rows())
+
+    def test_histogram_auc_matches_exact_auc(self):
+        rng = np.random.default_rng(5)
+        y = rng.random(5000) < 0.2
+        probabilities = np.clip(rng.normal(0.3 + 0.4 * y, 0.2), 0, 1)
+        bins = np.minimum((probabilities * 1000).astype(int), 999)
+        auc = ml_training._histogram_auc(
+            np.bincount(bins[y], minlength=1000), np.bincount(bins[~y], minlength=1000)
+        )
+        self.assertAlmostEqual(auc, roc_auc_score(y, probabilities), places=3)
+
+class DatasetCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.data_path = os.path.join(self.workdir, 'creditcard.csv')
+        write_synthetic_dataset(self.data_path, n_rows=500)
+
+    def open(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return open_dataset(self.data_path)
+
+    def test_cache_matches_csv(self):
+        dataset = self.open()
+        df = pd.read_csv(self.data_path)
+        self.assertEqual(dataset.rows, len(df))
+        self.assertEqual(dataset.columns, list(df.columns))
+        self.assertIsInstance(dataset['V1'], np.memmap)
+        np.testing.assert_allclose(dataset['V1'], df['V1'], rtol=1e-6)
+        np.testing.assert_array_equal(dataset['Class'], df['Class'])
+        chunks = list(dataset.iter_chunks(200))
+        self.assertEqual([len(chunk) for chunk in chunks], [200, 200, 100])
+
+    def test_reuses_cache_until_source_changes(self):
+        version = self.open().manifest['version']
+        with mock.patch('api.dataset_cache.pd.read_csv') as read_csv:
+            self.assertEqual(self.open().manifest['version'], version)
+        read_csv.assert_not_called()
+
+        # A touch without a content change keeps the cache
+        os.utime(self.data_path, (0, 0))
+        with mock.patch('api.dataset_cache.pd.read_csv') as read_csv:
+            self.assertEqual(self.open().manifest['version'], version)
+        read_csv.assert_not_called()
+
+        write_synthetic_dataset(self.data_path, n_rows=300, seed=9)
+        dataset = self.open()
+        self.assertNotEqual(dataset.manifest['version'], version)
+        self.assertEqual(dataset.rows, 300)
+
+class BackgroundTrainingTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.data_path = os.path.join(self.workdir, 'creditcard.csv')
+        self.model_dir = os.path.join(self.workdir, 'models')
+        write_synthetic_dataset(self.data_path)
+
+    def test_missing_model_trains_in_background(self):
+        cache = ml_fraud_model.ModelCache(self.model_dir, check_interval=0, data_path=self.data_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaisesMessage(ml_fraud_model.ModelNotReady, 'warming up'):
+                cache.get()
+            from .training_job import _background_threads
+            _background_threads[self.model_dir].join(timeout=60)
+        self.assertEqual(cache.get().metadata['feature_names'], FEATURE_NAMES)
+
+    def test_only_one_trainer_holds_the_lock(self):
+        lock = FileLock(os.path.join(self.model_dir, '.training.lock'))
+        self.assertTrue(lock.acquire(blocking=False))
+        self.addCleanup(lock.release)
+        self.assertFalse(FileLock(lock.path).acquire(blocking=False))
+
+        # Another process is training: don't start a second trainer
+        with mock.patch('api.training_job.threading.Thread') as thread:
+            self.assertTrue(start_background_training(self.model_dir, self.data_path))
+        thread.assert_not_called()
+
+    def test_prediction_endpoint_returns_503_while_warming_up(self):
+        cache = ml_fraud_model.ModelCache(self.model_dir, auto_train=False)
+        with mock.patch.object(ml_fraud_model, '_model_cache', cache):
+            response = self.client.post(
+                reverse('predict_fraud'),
+                data=json.dumps(sample_transaction()),
+                content_type='application/json',
+                HTTP_X_API_KEY=API_KEY
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['code'], 'model_warming_up')
+        self.assertIn('Retry-After', response)
+
+class AsyncViewTests(TrainedModelMixin, TestCase):
+    def setUp(self):
+        cache.clear()  # Cached list pages outlive the test database rows
+
+    async def test_concurrent_predictions_are_scored_and_saved(self):
+        async def post(features):
+            return await self.async_client.post(
+                reverse('predict_fraud'),
+                data=json.dumps(features),
+                content_type='application/json',
+                headers={'X-API-Key': API_KEY}
+            )
+        responses = await asyncio.gather(*(post(sample_transaction(Amount=10.0 + i)) for i in range(10)))
+        self.assertEqual([r.status_code for r in responses], [200] * 10)
+        self.assertEqual(await Transaction.objects.acount(), 10)
+
+    async def test_predict_transaction_is_async(self):
+        # Rows without stored features are scored too
+        transaction = await Transaction.objects.acreate(timestamp=timezone.now(), amount=42.0, fraud_probability=0.0)
+        response = await self.async_client.post(
+            reverse('predict_transaction'),
+            data=json.dumps({'transaction_id': transaction.id}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        await transaction.arefresh_from_db()
+        self.assertEqual((transaction.is_fraud, transaction.fraud_probability), (data['is_fraud'], data['fraud_probability']))
+
+    async def test_transactions_list_is_async(self):
+        await Transaction.objects.acreate(timestamp=timezone.now(), amount=5.0)
+        response = await self.async_client.get(reverse('transactions_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len((await aresponse_json(response))['transactions']), 1)
+
+class MicroBatcherTests(TrainedModelMixin, SimpleTestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        batcher = MicroBatcher(max_batch_size=8, max_latency_us=200000)
+        futures = [batcher.submit(sample_transaction(Amount=10.0 + i)) for i in range(8)]
+        results = [future.result(timeout=10) for future in futures]
+
+        for i, result in enumerate(results):
+            expected = ml_fraud_model.predict_fraud(sample_transaction(Amount=10.0 + i))
+            self.assertAlmostEqual(result['fraud_probability'], expected['fraud_probability'])
+            self.assertEqual(result['transaction_amount'], 10.0 + i)
+        stats = batcher.stats()
+        self.assertEqual(stats['rows'], 8)
+        self.assertEqual(stats['largest_batch'], 8)
+        self.assertEqual(stats['batch_size_histogram'], {'<=8': 1})
+
+    def test_invalid_row_only_fails_its_own_future(self):
+        batcher = MicroBatcher(max_batch_size=2, max_latency_us=200000)
+        good = batcher.submit(sample_transaction(), explain=False)
+        bad = batcher.submit(sample_transaction(Amount=-1))
+        self.assertNotIn('top_contributing_features', good.result(timeout=10))
+        with self.assertRaisesMessage(ValueError, 'Amount -1.0 is outside'):
+            bad.result(timeout=10)
+
+    def test_lone_request_is_flushed_after_max_latency(self):
+        batcher = MicroBatcher(max_batch_size=64, max_latency_us=1000)
+        self.assertIn('fraud_probability', batcher.predict(sample_transaction()))
+        self.assertEqual(batcher.stats()['batch_size_histogram'], {'<=1': 1})
+
+class TransactionWriterTests(TestCase):
+    def make_transactions(self, count):
+        return [Transaction(timestamp=timezone.now(), amount=float(i + 1)) for i in range(count)]
+
+    def test_sync_mode_writes_immediately(self):
+        TransactionWriter(mode='sync').save(self.make_transactions(3))
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_buffered_mode_writes_on_flush(self):
+        writer = TransactionWriter(mode='buffered', batch_size=100, flush_interval=60)
+        writer.save(self.make_transactions(5))
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertEqual(writer.pending(), 5)
+        writer.flush()
+        self.assertEqual(Transaction.objects.count(), 5)
+        self.assertEqual(writer.pending(), 0)
+
+    def test_buffered_mode_flushes_in_background_when_batch_is_full(self):
+        writer = TransactionWriter(mode='buffered', batch_size=3, flush_interval=60)
+        written = threading.Event()
+        with mock.patch.object(writer, '_write', side_effect=lambda rows: written.set()) as write:
+            writer.save(self.make_transactions(3))
+            self.assertTrue(written.wait(timeout=10))
+        self.assertEqual(len(write.call_args[0][0]), 3)
+
+    async def test_buffered_async_save_does_not_touch_the_database(self):
+        writer = TransactionWriter(mode='buffered', batch_size=100, flush_interval=60)
+        with mock.patch.object(writer, '_write') as write, \
+                mock.patch.object(Transaction.objects, 'abulk_create') as abulk_create:
+            await writer.asave(self.make_transactions(2))
+        write.assert_not_called()
+        abulk_create.assert_not_called()
+        self.assertEqual(writer.pending(), 2)
+
+class TransactionListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        Transaction.objects.bulk_create([
+            Transaction(
+                timestamp=now - timezone.timedelta(hours=i), amount=10.0 * (i + 1),
+                is_fraud=i % 3 == 0, fraud_probability=i / 25
+            )
+            for i in range(25)
+        ])
+        # Give several rows the same created_at so the id tie-breaker matters
+        Transaction.objects.filter(amount__lte=50).update(created_at=now)
+
+    def setUp(self):
+        cache.clear()  # Cached list pages outlive the test database rows
+
+    def get(self, **params):
+        response = self.client.get(reverse('transactions_list'), params)
+        return response.status_code, response_json(response)
+
+    def test_cursor_walks_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            status, data = self.get(limit=7, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(status, 200)
+            seen.extend(t['id'] for t in data['transactions'])
+            cursor = data['pagination']['next_cursor']
+            if not data['pagination']['has_more']:
+                break
+        expected = list(Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        _, data = self.get(is_fraud='true', min_probability=0.2, max_amount=200)
+        rows = data['transactions']
+        self.assertTrue(rows)
+        for row in rows:
+            self.assertTrue(row['is_fraud'])
+            self.assertGreaterEqual(row['fraud_probability'], 0.2)
+            self.assertLessEqual(row['amount'], 200)
+        self.assertEqual(len(rows), Transaction.objects.filter(
+            is_fraud=True, fraud_probability__gte=0.2, amount__lte=200).count())
+
+    def test_time_window(self):
+        since = (timezone.now() - timezone.timedelta(hours=4, minutes=30)).isoformat()
+        _, data = self.get(since=since)
+        self.assertEqual(len(data['transactions']), 5)
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'cursor': 'garbage'}, {'min_amount': 'lots'}, {'is_fraud': 'maybe'}, {'since': 'yesterday'}):
+            status, data = self.get(**params)
+            self.assertEqual(status, 400, params)
+            self.assertEqual(data['code'], 'invalid_filter')
+
+class FeatureVectorStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Cached list pages outlive the test database rows
+
+    def test_features_round_trip_as_float32(self):
+        features = {f'V{i}': i / 10 for i in range(1, 29)}
+        transaction = Transaction.objects.create(timestamp=timezone.now(), amount=1.0, ml_features=features)
+        transaction.refresh_from_db()
+        self.assertEqual(len(transaction.feature_vector), 28 * 4)
+        self.assertEqual(transaction.features_array.dtype, np.float32)
+        np.testing.assert_allclose(transaction.features_array, list(features.values()), rtol=1e-6)
+        self.assertEqual(list(transaction.ml_features), list(features))
+
+    def test_missing_features_are_left_out(self):
+        transaction = Transaction(timestamp=timezone.now(), amount=1.0, ml_features={'V1': 1.0})
+        self.assertEqual(transaction.ml_features, {'V1': 1.0})
+        self.assertEqual(Transaction(timestamp=timezone.now(), amount=1.0).ml_features, {})
+
+    def test_transaction_list_does_not_load_feature_vectors(self):
+        Transaction.objects.create(timestamp=timezone.now(), amount=1.0, ml_features={'V1': 1.0})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transactions_list'))
+            response_body(response)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('feature_vector', queries.captured_queries[-1]['sql'])
+
+class RollupTests(TestCase):
+    def make_transaction(self, minute, amount, is_fraud, probability):
+        timestamp = timezone.make_aware(datetime(2024, 5, 1, 10, minute, 30))
+        return Transaction(timestamp=timestamp, amount=amount, is_fraud=is_fraud, fraud_probability=probability)
+
+    def snapshot(self):
+        return sorted(
+            (r.granularity, r.bucket_start, r.count, r.fraud_count, r.amount_sum, r.fraud_amount_sum, r.probability_histogram)
+            for r in TransactionRollup.objects.all()
+        )
+
+    def test_writes_update_rollups_incrementally(self):
+        writer = TransactionWriter(mode='sync')
+        writer.save([self.make_transaction(0, 10.0, False, 0.05), self.make_transaction(0, 30.0, True, 0.95)])
+        writer.save([self.make_transaction(1, 5.0, False, 0.35)])
+
+        hour = TransactionRollup.objects.get(granularity='hour')
+        self.assertEqual((hour.count, hour.fraud_count, hour.amount_sum, hour.fraud_amount_sum), (3, 1, 45.0, 30.0))
+        self.assertEqual(hour.probability_histogram, [1, 0, 0, 1, 0, 0, 0, 0, 0, 1])
+        minutes = TransactionRollup.objects.filter(granularity='minute').order_by('bucket_start')
+        self.assertEqual([m.count for m in minutes], [2, 1])
+
+    def test_rebuild_matches_incremental_rollups(self):
+        rng = np.random.default_rng(0)
+        TransactionWriter(mode='sync').save([
+            self.make_transaction(int(rng.integers(60)), float(rng.uniform(1, 100)), bool(rng.random() < 0.2), float(p))
+            for p in [0.0, 0.1, 0.3, 0.7, 0.9, 1.0] + list(rng.random(50))
+        ])
+        incremental = self.snapshot()
+        rebuild_rollups()
+        rebuilt = self.snapshot()
+        self.assertEqual(len(rebuilt), len(incremental))
+        for expected, actual in zip(incremental, rebuilt):
+            self.assertEqual(expected[:4] + expected[6:], actual[:4] + actual[6:])
+            self.assertAlmostEqual(expected[4], actual[4])
+            self.assertAlmostEqual(expected[5], actual[5])
+
+    def test_save_and_delete_keep_rollups_in_step(self):
+        transaction = self.make_transaction(0, 10.0, False, 0.05)
+        transaction.save()
+        other = Transaction.objects.create(
+            timestamp=timezone.make_aware(datetime(2024, 5, 1, 11, 5)), amount=7.0, is_fraud=True, fraud_probability=0.9
+        )
+        # An admin-style edit moving the transaction to another minute with a new amount and score
+        transaction.timestamp = timezone.make_aware(datetime(2024, 5, 1, 10, 7))
+        transaction.amount, transaction.is_fraud, transaction.fraud_probability = 25.0, True, 0.75
+        transaction.save()
+        other.delete()
+
+        incremental = [row for row in self.snapshot() if row[2]]
+        rebuild_rollups()
+        self.assertEqual(incremental, self.snapshot())
+        hour = TransactionRollup.objects.get(granularity='hour')
+        self.assertEqual((hour.count, hour.fraud_count, hour.amount_sum), (1, 1, 25.0))
+
+    def test_migration_backfills_existing_transactions(self):
+        Transaction.objects.bulk_create([self.make_transaction(0, 10.0, False, 0.05), self.make_transaction(1, 5.0, True, 0.95)])
+        self.assertFalse(TransactionRollup.objects.exists())
+        migration = importlib.import_module('api.migrations.0008_backfill_transaction_rollups')
+        migration.backfill_rollups(django_apps, None)
+        self.assertEqual(TransactionRollup.objects.get(granularity='hour').count, 2)
+        # The migration keeps its own copy of the rebuild; it must agree with the live one
+        backfilled = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(backfilled, self.snapshot())
+
+    def test_stats_endpoint_serves_rollups(self):
+        TransactionWriter(mode='sync').save([
+            self.make_transaction(0, 10.0, False, 0.05), self.make_transaction(2, 30.0, True, 0.95)
+        ])
+        response = self.client.get(reverse('fraud_stats'), {
+            'granularity': 'minute', 'since': '2024-05-01T10:00:00+00:00', 'until': '2024-05-01T11:00:00+00:00'
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([b['count'] for b in data['buckets']], [1, 1])
+        self.assertEqual(data['buckets'][1]['bucket_start'], '2024-05-01T10:02:00+00:00')
+        self.assertEqual(data['totals']['fraud_rate'], 0.5)
+        self.assertEqual(data['totals']['probability_histogram'], [1] + [0] * 8 + [1])
+
+    def test_stats_endpoint_accepts_naive_datetimes(self):
+        TransactionWriter(mode='sync').save([
+            self.make_transaction(0, 10.0, False, 0.05), self.make_transaction(2, 30.0, True, 0.95)
+        ])
+        response = self.client.get(reverse('fraud_stats'), {
+            'granularity': 'minute', 'since': '2024-05-01T10:00:00', 'until': '2024-05-01T11:00:00'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([b['count'] for b in response.json()['buckets']], [1, 1])
+
+        # until defaults to the (aware) current time
+        since = (timezone.now() - timedelta(hours=2)).replace(tzinfo=None).isoformat()
+        response = self.client.get(reverse('fraud_stats'), {'granularity': 'hour', 'since': since})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_filters_accept_naive_datetimes(self):
+        cache.clear()
+        TransactionWriter(mode='sync').save([self.make_transaction(0, 10.0, False, 0.05)])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.client.get(reverse('transactions_list'), {'since': '2024-05-01T10:00:00'},
+                                       HTTP_X_API_KEY=API_KEY)
+            data = response_json(response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data['transactions']), 1)
+
+    def test_stats_endpoint_rejects_bad_parameters(self):
+        for params in ({'granularity': 'day'}, {'since': 'yesterday'},
+                       {'granularity': 'minute', 'since': '2024-01-01T00:00:00+00:00', 'until': '2024-02-01T00:00:00+00:00'}):
+            response = self.client.get(reverse('fraud_stats'), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['code'], 'invalid_filter')
+
+class TransactionEventTests(TestCase):
+    def setUp(self):
+        self.broker = TransactionEventBroker(buffer_size=3)
+        patcher = mock.patch('api.events._broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_subscribers_receive_events_published_from_other_threads(self):
+        subscriber, backlog = self.broker.subscribe()
+        self.assertEqual(backlog, [])
+        thread = threading.Thread(target=self.broker.publish, args=('created', {'id': 1}))
+        thread.start()
+        event = await asyncio.wait_for(subscriber.queue.get(), timeout=5)
+        thread.join()
+        self.assertEqual((event.type, event.data), ('created', {'id': 1}))
+
+    async def test_resume_replays_buffered_events_or_resets(self):
+        events = [self.broker.publish('created', {'id': i}) for i in range(5)]
+        _, backlog = self.broker.subscribe(events[2].id)
+        self.assertEqual([event.data['id'] for event in backlog], [3, 4])
+        _, backlog = self.broker.subscribe(events[4].id)
+        self.assertEqual(backlog, [])
+        # events[0] fell out of the ring buffer, so the client missed events[1]
+        _, backlog = self.broker.subscribe(events[0].id)
+        self.assertEqual([(event.id, event.type) for event in backlog], [(events[4].id, 'reset')])
+
+    def test_create_transaction_publishes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('create_transaction'),
+                data=json.dumps({'timestamp': timezone.now().isoformat(), 'amount': 12.5}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        event = self.broker._buffer[-1]
+        self.assertEqual(event.type, 'created')
+        self.assertEqual(event.data, response.json())
+
+    def test_large_writes_publish_one_batch_event(self):
+        transactions = [
+            Transaction(timestamp=timezone.now(), amount=float(i), is_fraud=False, fraud_probability=0.1)
+            for i in range(5)
+        ]
+        with self.settings(FRAUD_EVENTS_MAX_PER_WRITE=2), self.captureOnCommitCallbacks(execute=True):
+            TransactionWriter(mode='sync').save(transactions)
+        self.assertEqual(len(self.broker._buffer), 1)
+        event = self.broker._buffer[-1]
+        self.assertEqual(event.type, 'batch_created')
+        self.assertEqual(event.data, {'count': 5, 'ids': [t.id for t in transactions]})
+
+    async def test_stream_sends_backlog_in_event_stream_format(self):
+        first = self.broker.publish('created', {'id': 1})
+        self.broker.publish('rescored', {'id': 1})
+        response = await self.async_client.get(reverse('transaction_events'), headers={'Last-Event-ID': str(first.id)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry: '))
+        self.assertEqual(
+            await anext(chunks),
+            f'id: {first.id + 1}\nevent: rescored\ndata: {{"id": 1}}\n\n'.encode()
+        )
+        await chunks.aclose()
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_transactions_list_is_served_from_cache_until_a_write_commits(self):
+        url = reverse('transactions_list')
+        Transaction.objects.create(timestamp=timezone.now(), amount=5.0)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        body = response_body(first)  # Cached once fully streamed
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertFalse(second.streaming)
+        self.assertEqual(second.content, body)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionWriter(mode='sync').save([Transaction(timestamp=timezone.now(), amount=7.0)])
+        third = self.client.get(url)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual(len(response_json(third)['transactions']), 2)
+
+    def test_if_none_match_returns_304(self):
+        url = reverse('transactions_list')
+        etag = self.client.get(url, {'limit': 5})['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'limit': 5}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # Different query string, different representation
+        self.assertEqual(self.client.get(url, {'limit': 6}, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_saving_a_transaction_invalidates_on_commit(self):
+        url = reverse('transactions_list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(timestamp=timezone.now(), amount=5.0)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_errors_are_not_cached(self):
+        url = reverse('transactions_list')
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+        self.assertNotIn('ETag', self.client.get(url, {'limit': 'x'}))
+
+class ModelInfoCacheTests(TrainedModelMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_model_info_etag_follows_model_version(self):
+        url = reverse('model_info')
+        first = self.client.get(url, HTTP_X_API_KEY=API_KEY)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['model_info']['feature_count'], len(FEATURE_NAMES))
+        cached = self.client.get(url, HTTP_X_API_KEY=API_KEY, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        bundle = self.model_cache.get()
+        with mock.patch.object(self.model_cache, 'get', return_value=bundle._replace(signature=((1, 1),))):
+            swapped = self.client.get(url, HTTP_X_API_KEY=API_KEY, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(swapped.status_code, 200)
+        self.assertNotEqual(swapped['ETag'], first['ETag'])
+
+class StreamingSerializationTests(SimpleTestCase):
+    def collect(self, chunks):
+        async def consume():
+            return b''.join([part async for part in chunks])
+        return json.loads(async_to_sync(consume)())
+
+    def test_streamed_object_matches_regular_encoding(self):
+        items = [{'id': i, 'amount': np.float64(i / 3), 'at': timezone.now()} for i in range(7)]
+        data = self.collect(astream_object({'count': 7}, 'items', items, lambda: {'done': True}, chunk_size=3))
+        self.assertEqual(list(data), ['count', 'items', 'done'])
+        self.assertEqual([item['id'] for item in data['items']], list(range(7)))
+        self.assertEqual(data['items'][1]['at'], items[1]['at'].isoformat())
+        self.assertAlmostEqual(data['items'][2]['amount'], 2 / 3)
+
+    def test_empty_head_tail_and_chunks(self):
+        async def chunks():
+            yield []
+            yield [1]
+            yield [2, 3]
+        self.assertEqual(self.collect(astream_object({}, 'items', chunks())), {'items': [1, 2, 3]})
+        self.assertEqual(self.collect(astream_object({}, 'items', [])), {'items': []})
+
+class CleanDataTests(SimpleTestCase):
+    def make_frame(self, n_rows=2000, seed=0):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame(rng.standard_t(4, size=(n_rows, 28)), columns=FEATURE_NAMES[:-1])
+        df.insert(0, 'Time', np.arange(n_rows, dtype=float))
+        df['Amount'] = rng.exponential(80, n_rows)
+        df['Class'] = (rng.random(n_rows) < 0.02).astype(int)
+        df.iloc[3, 5] = np.nan
+        return df
+
+    def test_single_mask_from_statistics_of_complete_rows(self):
+        df = self.make_frame()
+        complete = df.dropna()
+        columns = [column for column in df.columns if column != 'Class']
+        z = (complete[columns] - complete[columns].mean()).abs() / complete[columns].std()
+        expected = complete.index[(z <= 3).all(axis=1)]
+
+        cleaned = clean_data(df)
+        self.assertEqual(list(cleaned.index), list(expected))
+        # Column order no longer matters, and fraud labels are never treated as outliers
+        self.assertEqual(list(clean_data(df[df.columns[::-1]]).index), list(expected))
+        self.assertEqual(cleaned['Class'].sum(), df.loc[expected, 'Class'].sum())
+
+    def test_standardizes_features_as_float32_without_copy_warnings(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            cleaned = clean_data(self.make_frame())
+        self.assertEqual(cleaned['V1'].dtype, np.float32)
+        np.testing.assert_allclose(cleaned[FEATURE_NAMES[:-1]].mean(), 0, atol=1e-5)
+        np.testing.assert_allclose(cleaned[FEATURE_NAMES[:-1]].std(ddof=0), 1, atol=1e-4)
+
+    def test_chunked_matches_single_pass(self):
+        df = self.make_frame()
+        expected = clean_data(df)
+        chunked = clean_data(df, chunksize=300)
+        self.assertEqual(list(chunked.index), list(expected.index))
+        np.testing.assert_allclose(chunked[FEATURE_NAMES[:-1]], expected[FEATURE_NAMES[:-1]], atol=1e-5)
+
+    def test_reuses_training_scaler(self):
+        df = self.make_frame()
+        scaler = StandardScaler().fit(df[FEATURE_NAMES].dropna())
+        cleaned = clean_data(df, scaler=scaler)
+        expected = scaler.transform(df.loc[cleaned.index, FEATURE_NAMES])
+        np.testing.assert_allclose(cleaned[FEATURE_NAMES], expected, rtol=1e-4, atol=1e-4)
+
+class TimingTests(TrainedModelMixin, TestCase):
+    def setUp(self):
+        reset_timing_stats()
+
+    def stages(self, response):
+        return {item.split(';')[0] for item in response['Server-Timing'].split(', ')}
+
+    def post_prediction(self):
+        return self.client.post(
+            reverse('predict_fraud'), data=json.dumps(sample_transaction()),
+            content_type='application/json', HTTP_X_API_KEY=API_KEY
+        )
+
+    def test_server_timing_header_and_histograms(self):
+        with self.settings(FRAUD_MICROBATCH_ENABLED=False):
+            response = self.post_prediction()
+        self.assertEqual(response.status_code, 200)
+        # Stages inside the scoring thread are attributed to the request too
+        self.assertTrue({'parse', 'predict', 'load_model', 'validate', 'score', 'explain', 'db', 'total'}
+                        <= self.stages(response))
+
+        metrics = self.client.get(reverse('internal_metrics'), HTTP_X_API_KEY=API_KEY).json()['timing']
+        self.assertEqual(metrics['predict_fraud']['total']['count'], 1)
+        self.assertEqual(sum(metrics['predict_fraud']['score']['buckets_ms'].values()), 1)
+
+    def test_micro_batches_are_recorded_separately(self):
+        with self.settings(FRAUD_MICROBATCH_ENABLED=True):
+            response = self.post_prediction()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('score', self.stages(response))
+        self.assertIn('score', timing_stats()['micro_batcher'])
+
+    def test_spans_are_no_ops_outside_a_request(self):
+        with span('validate'):
+            pass
+        self.assertEqual(timing_stats(), {})
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for ms in [0.2] * 90 + [30] * 9 + [10000]:
+            histogram.observe(ms)
+        self.assertEqual((histogram.quantile(0.5), histogram.quantile(0.95), histogram.quantile(1.0)), (0.25, 50, None))
+
+class ImportTransactionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.workdir = tempfile.mkdtemp()
+        cls.model_dir = train_synthetic_model(cls.workdir, n_rows=600)
+        cls.data_path = os.path.join(cls.workdir, 'creditcard.csv')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+        super().tearDownClass()
+
+    def run_import(self, **options):
+        out = io.StringIO()
+        call_command(
+            'import_transactions', data_path=self.data_path, model_dir=self.model_dir,
+            chunksize=250, batch_size=100, start='2024-05-01T00:00:00+00:00', stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_imports_scores_and_rolls_up_every_row(self):
+        output = self.run_import()
+        self.assertIn('Imported 600 transactions', output)
+        self.assertEqual(Transaction.objects.count(), 600)
+
+        df = pd.read_csv(self.data_path)
+        bundle = ml_fraud_model.ModelCache(self.model_dir, auto_train=False).get()
+        probabilities, _ = bundle.engine.score(df[bundle.metadata['feature_names']].to_numpy())
+        last = Transaction.objects.order_by('timestamp').last()
+        self.assertEqual(last.timestamp, timezone.make_aware(datetime(2024, 5, 1, 0, 9, 59)))
+        self.assertAlmostEqual(last.fraud_probability, probabilities[-1])
+        self.assertAlmostEqual(last.amount, df['Amount'].iloc[-1])
+        np.testing.assert_allclose(last.features_array, df[FEATURE_NAMES[:-1]].iloc[-1], rtol=1e-6)
+
+        hour = TransactionRollup.objects.get(granularity='hour')
+        self.assertEqual(hour.count, 600)
+        self.assertEqual(hour.fraud_count, Transaction.objects.filter(is_fraud=True).count())
+        self.assertEqual(sum(hour.probability_histogram), 600)
+        self.assertEqual(TransactionRollup.objects.filter(granularity='minute').count(), 10)
+
+    def test_rollups_match_a_rebuild(self):
+        self.run_import(no_cache=True, limit=333)
+        self.assertEqual(Transaction.objects.count(), 333)
+        incremental = sorted(
+            (r.granularity, r.bucket_start, r.count, r.fraud_count, r.probability_histogram, round(r.amount_sum, 6))
+            for r in TransactionRollup.objects.all()
+        )
+        rebuild_rollups()
+        rebuilt = sorted(
+            (r.granularity, r.bucket_start, r.count, r.fraud_count, r.probability_histogram, round(r.amount_sum, 6))
+            for r in TransactionRollup.objects.all()
+        )
+        self.assertEqual(incremental, rebuilt)
+
+class RescoreTransactionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.workdir = tempfile.mkdtemp()
+        cls.model_dir = train_synthetic_model(cls.workdir, n_rows=600)
+        cls.bundle = ml_fraud_model.ModelCache(cls.model_dir, auto_train=False).get()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Stale scores from "the previous model": everything flagged with probability 0.99
+        rng = np.random.default_rng(1)
+        self.features = rng.normal(0, 1, size=(50, len(FEATURE_NAMES) - 1)).astype(np.float32)
+        self.features[::5, [3, 10]] += 4
+        start = timezone.make_aware(datetime(2024, 5, 1))
+        transactions = []
+        for i, vector in enumerate(self.features):
+            transaction = Transaction(timestamp=start + timedelta(minutes=i), amount=10.0 + i,
+                                      is_fraud=True, fraud_probability=0.99)
+            transaction.features_array = vector
+            transactions.append(transaction)
+        Transaction.objects.bulk_create(transactions)
+        rebuild_rollups()
+
+    def rescore(self, **options):
+        out = io.StringIO()
+        options = dict({'workers': 1, 'chunk_size': 7}, **options)
+        call_command('rescore_transactions', model_dir=self.model_dir, stdout=out, **options)
+        return out.getvalue()
+
+    def expected_scores(self):
+        matrix = np.column_stack([self.features.astype(np.float64), 10.0 + np.arange(len(self.features))])
+        return self.bundle.engine.score(matrix)
+
+    def rollup_rows(self):
+        return sorted(
+            (r.granularity, r.bucket_start, r.count, r.fraud_count, r.probability_histogram)
+            for r in TransactionRollup.objects.all()
+        )
+
+    def assert_rescored(self, ids=None):
+        probabilities, is_fraud = self.expected_scores()
+        for i, t in enumerate(Transaction.objects.order_by('id')):
+            if ids is None or t.id in ids:
+                self.assertAlmostEqual(t.fraud_probability, probabilities[i], places=6)
+                self.assertEqual(t.is_fraud, bool(is_fraud[i]))
+            else:
+                self.assertEqual(t.fraud_probability, 0.99)
+
+    def test_rescores_every_transaction_and_moves_the_rollups(self):
+        output = self.rescore()
+        self.assertIn('Rescored 50 transactions', output)
+        self.assert_rescored()
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertFalse(os.path.exists(os.path.join(self.model_dir, 'rescore_checkpoint.json')))
+
+    def test_process_pool_matches_in_process_scoring(self):
+        self.rescore(workers=2)
+        self.assert_rescored()
+
+    def test_time_window(self):
+        self.rescore(since='2024-05-01T00:10:00+00:00', until='2024-05-01T00:20:00+00:00')
+        ids = set(Transaction.objects.filter(
+            timestamp__gte=timezone.make_aware(datetime(2024, 5, 1, 0, 10)),
+            timestamp__lt=timezone.make_aware(datetime(2024, 5, 1, 0, 20)),
+        ).values_list('id', flat=True))
+        self.assertEqual(len(ids), 10)
+        self.assert_rescored(ids)
+
+    def test_resumes_from_checkpoint(self):
+        ids = list(Transaction.objects.order_by('id').values_list('id', flat=True))
+        checkpoint_path = os.path.join(self.workdir, 'checkpoint.json')
+        with open(checkpoint_path, 'w') as f:
+            json.dump({
+                'model_signature': [list(entry) for entry in self.bundle.signature], 'since': None, 'until': None,
+                'next_id': ids[30], 'last_id': ids[-1],
+            }, f)
+
+        output = self.rescore(checkpoint=checkpoint_path)
+        self.assertIn(f'Resuming from id {ids[30]}', output)
+        self.assert_rescored(set(ids[30:]))
+        self.assertFalse(os.path.exists(checkpoint_path))
+
+    def test_checkpoint_for_another_model_is_ignored(self):
+        checkpoint_path = os.path.join(self.workdir, 'stale.json')
+        with open(checkpoint_path, 'w') as f:
+            json.dump({'model_signature': [], 'since': None, 'until': None, 'next_id': 10 ** 9, 'last_id': 10 ** 9}, f)
+        self.rescore(checkpoint=checkpoint_path)
+        self.assert_rescored()
+
+class ImportTests(SimpleTestCase):
+    def test_serving_path_skips_training_dependencies(self):
+        code = (
+            "import sys, django; django.setup(); import fraud_detection_backend.urls; "
+            "print(' '.join(m for m in ('pandas', 'sklearn', 'joblib', 'scipy') if m in sys.modules))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='fraud_detection_backend.settings')
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_training_cli_runs(self):
+        result = subprocess.run([sys.executable, '-m', 'api.ml_training', '--help'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('--streaming', result.stdout)
+
+class PreloadTests(TrainedModelMixin, SimpleTestCase):
+    def test_preload_model_loads_the_bundle(self):
+        bundle = ml_fraud_model.preload_model()
+        self.assertIs(bundle, self.model_cache.get())
+
+    def test_preload_model_does_not_start_training(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        with mock.patch.object(ml_fraud_model, '_model_cache', ml_fraud_model.ModelCache(workdir)), \
+                mock.patch('api.training_job.start_background_training') as start_training:
+            self.assertIsNone(ml_fraud_model.preload_model())
+        start_training.assert_not_called()
+
+    def test_gunicorn_hooks_load_the_model_in_the_master(self):
+        config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+        self.assertTrue(config['preload_app'])
+        self.addCleanup(gc.unfreeze)
+        server = mock.Mock()
+        server.cfg.workers = 1
+
+        config['when_ready'](server)
+        self.assertGreater(gc.get_freeze_count(), 0)
+        server.log.info.assert_called_once_with('Loaded model version %s for the workers', 1)
+
+        config['on_reload'](server)
+        self.assertEqual(server.log.info.call_count, 2)
+        server.log.warning.assert_not_called()
+
+    def test_gunicorn_defaults_to_one_worker_and_warns_about_per_process_caches(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('GUNICORN_WORKERS', None)
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+        self.assertEqual(config['workers'], 1)
+        self.addCleanup(gc.unfreeze)
+        server = mock.Mock()
+        server.cfg.workers = 4
+        config['when_ready'](server)
+        self.assertIn('shared CACHES backend', server.log.warning.call_args[0][0])
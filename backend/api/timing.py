@@ -0,0 +1,138 @@
+"""
+Per-stage request timing.
+
+ServerTimingMiddleware gives every request a Recorder in a context
+variable; code along the request path wraps its stages in span(name), and
+the summed durations are sent back in a Server-Timing header and added to
+per-view latency histograms (see timing_stats()). Outside a recorded
+request span() returns a shared no-op context manager, and with
+FRAUD_TIMING_ENABLED = False the middleware removes itself, so the
+instrumentation costs next to nothing when it is off.
+
+Context variables follow the request into sync_to_async threads and
+run_scoring(); the micro-batcher scores many requests at once, so it
+records its batches with collect('micro_batcher') instead.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_recorder = contextvars.ContextVar('fraud_timing_recorder', default=None)
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is everything slower
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Recorder:
+    """Summed seconds per stage name"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add(self.name, time.perf_counter() - self.start)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+def span(name):
+    """Context manager timing one stage of the current request (no-op outside one)"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bound)"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        buckets = {f'<={bound:g}': count for bound, count in zip(BUCKET_BOUNDS_MS, self.counts)}
+        buckets[f'>{BUCKET_BOUNDS_MS[-1]:g}'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': self.sum_ms / self.count if self.count else 0.0,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets_ms': buckets,
+        }
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+def record(group, stages):
+    """Add one request's (or batch's) stage durations in seconds to the histograms of group"""
+    with _histograms_lock:
+        for stage, seconds in stages.items():
+            histogram = _histograms.get((group, stage))
+            if histogram is None:
+                histogram = _histograms[group, stage] = Histogram()
+            histogram.observe(seconds * 1000)
+
+def timing_stats():
+    """{group: {stage: histogram snapshot}} since startup (or the last reset)"""
+    with _histograms_lock:
+        stats = {}
+        for (group, stage), histogram in sorted(_histograms.items()):
+            stats.setdefault(group, {})[stage] = histogram.snapshot()
+        return stats
+
+def reset_timing_stats():
+    with _histograms_lock:
+        _histograms.clear()
+
+@contextmanager
+def collect(group):
+    """Record the spans inside the block (e.g. one micro-batch) into group's histograms"""
+    recorder = Recorder()
+    token = _recorder.set(recorder)
+    start = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        record(group, dict(recorder.stages, total=time.perf_counter() - start))
+
+def server_timing_header(stages):
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in stages.items())
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .ml_fraud_model import DATA_PATH, MODEL_DIR, serving_paths
+from .ml_training import train_fraud_model, train_fraud_model_streaming
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = '.training.lock'
+
+# Don't restart a failed background training more often than this
+TRAINING_RETRY_INTERVAL = 60.0
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, shared by every process on the host.
+
+    The OS drops the lock when the holder exits, so a crashed trainer never
+    leaves a stale lock behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Take the lock; with blocking=False return False if someone else holds it"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise BlockingIOError
+                        time.sleep(0.5)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+def training_lock(model_dir=MODEL_DIR):
+    return FileLock(os.path.join(model_dir, LOCK_FILENAME))
+
+def artifacts_exist(model_dir=MODEL_DIR):
+    return all(os.path.exists(path) for path in serving_paths(model_dir))
+
+def _train(lock, model_dir, data_path, streaming, **trainer_kwargs):
+    """Train while holding lock, unless another trainer finished in the meantime"""
+    try:
+        if artifacts_exist(model_dir):
+            return False
+        trainer = train_fraud_model_streaming if streaming else train_fraud_model
+        trainer(data_path=data_path, model_dir=model_dir, **trainer_kwargs)
+        return True
+    finally:
+        lock.release()
+
+def run_training_job(model_dir=MODEL_DIR, data_path=DATA_PATH, streaming=False, force=False, **trainer_kwargs):
+    """
+    Train in the calling thread, waiting for any other trainer to finish first.
+
+    Returns False when the artifacts already exist (or another process just
+    produced them) and force is not set.
+    """
+    lock = training_lock(model_dir)
+    lock.acquire()
+    if force:
+        try:
+            trainer = train_fraud_model_streaming if streaming else train_fraud_model
+            trainer(data_path=data_path, model_dir=model_dir, **trainer_kwargs)
+            return True
+        finally:
+            lock.release()
+    return _train(lock, model_dir, data_path, streaming, **trainer_kwargs)
+
+_background_lock = threading.Lock()
+_background_threads = {}
+_background_failures = {}
+
+def _train_in_background(lock, model_dir, data_path):
+    try:
+        _train(lock, model_dir, data_path, streaming=False)
+        logger.info('Background training finished, model saved to %s', model_dir)
+    except Exception:
+        _background_failures[model_dir] = time.monotonic()
+        logger.exception('Background training into %s failed', model_dir)
+
+def start_background_training(model_dir=MODEL_DIR, data_path=DATA_PATH):
+    """
+    Make sure a trainer is running for model_dir without blocking the caller.
+
+    At most one process on the host trains at a time: the one that wins the
+    file lock starts a daemon thread, everybody else just keeps waiting for
+    the artifacts to appear. Returns False if a recent attempt failed and
+    no trainer is running.
+    """
+    with _background_lock:
+        thread = _background_threads.get(model_dir)
+        if thread is not None and thread.is_alive():
+            return True
+
+        failed_at = _background_failures.get(model_dir)
+        if failed_at is not None and time.monotonic() - failed_at < TRAINING_RETRY_INTERVAL:
+            return False
+
+        lock = training_lock(model_dir)
+        if not lock.acquire(blocking=False):
+            return True  # Another process is training
+
+        thread = threading.Thread(
+            target=_train_in_background, args=(lock, model_dir, data_path),
+            name='fraud-model-training', daemon=True
+        )
+        _background_threads[model_dir] = thread
+        thread.start()
+        return True
@@ -3,6 +3,12 @@ from . import views
 
 urlpatterns = [
     path('transactions/', views.transactions_list, name='transactions_list'),
+    path('transactions/events/', views.transaction_events, name='transaction_events'),
     path('transactions/create/', views.create_transaction, name='create_transaction'),
     path('predict/', views.predict_transaction, name='predict_transaction'),
+    path('predict/fraud/', views.predict_fraud_view, name='predict_fraud'),
+    path('predict/batch/', views.predict_fraud_batch_view, name='predict_fraud_batch'),
+    path('model-info/', views.model_info, name='model_info'),
+    path('stats/', views.fraud_stats, name='fraud_stats'),
+    path('internal/metrics/', views.internal_metrics, name='internal_metrics'),
 ]
@@ -1,44 +1,118 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
+from .dataset_cache import TARGET_COLUMN, open_dataset
+from .ml_fraud_model import DATA_PATH, TOP_CONTRIBUTORS
+from .scoring import ScoringEngine, top_contributions
 
-def clean_data(df):
+def load_dataset(data_path=DATA_PATH, columns=None):
     """
-    Clean transaction data by removing outliers and standardizing features
+    Open the transaction dataset as a DataFrame backed by the binary cache
     """
-    # Remove rows with missing values
-    df = df.dropna()
+    return open_dataset(data_path).to_frame(columns)
+
+# Rows with any numeric value further than this many standard deviations from its column mean are outliers
+Z_SCORE_LIMIT = 3.0
+FEATURE_COLUMNS = [f'V{i}' for i in range(1, 29)]
+
+def _row_chunks(n_rows, chunksize):
+    chunksize = chunksize or max(n_rows, 1)
+    return [slice(start, min(start + chunksize, n_rows)) for start in range(0, n_rows, chunksize)]
+
+def _merge_moments(a, b):
+    """Combine (count, mean, sum of squared deviations) of two row sets (Chan et al.)"""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n_a == 0 or n_b == 0:
+        return b if n_a == 0 else a
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+def clean_data(df, scaler=None, z_limit=Z_SCORE_LIMIT, chunksize=None, dtype=np.float32):
+    """
+    Clean transaction data by removing outliers and standardizing features.
+
+    Rows with missing values, or with any numeric column (other than the
+    Class label) more than z_limit standard deviations from its mean, are
+    dropped with a single mask; the means and standard deviations are
+    computed once over the complete rows, so column order doesn't matter.
+    V1-V28 are then standardized as dtype, with a new StandardScaler fitted
+    on the kept rows or the given (training) scaler, in which case its own
+    feature columns are transformed instead.
+
+    With chunksize the input is processed that many rows at a time, so the
+    float working arrays stay small for large frames.
+    """
+    numeric_columns = [
+        column for column in df.select_dtypes(include=[np.number]).columns if column != TARGET_COLUMN
+    ]
+    numeric_index = df.columns.get_indexer(numeric_columns)
+    feature_columns = list(getattr(scaler, 'feature_names_in_', FEATURE_COLUMNS))
+    standardize = all(column in df.columns for column in feature_columns)
+    feature_index = df.columns.get_indexer(feature_columns) if standardize else None
+    chunks = _row_chunks(len(df), chunksize)
+    
+    # Pass 1: column statistics over the rows without missing values
+    complete = [df.iloc[rows].notna().all(axis=1).to_numpy() for rows in chunks]
+    moments = (0, np.zeros(len(numeric_columns)), np.zeros(len(numeric_columns)))
+    for rows, rows_complete in zip(chunks, complete):
+        values = df.iloc[rows, numeric_index].to_numpy(dtype=dtype)[rows_complete]
+        if len(values):
+            mean = values.mean(axis=0, dtype=np.float64)
+            moments = _merge_moments(moments, (len(values), mean, ((values - mean) ** 2).sum(axis=0)))
+    count, mean, m2 = moments
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 / (count - 1))  # ddof=1 like pandas
+    mean, limit = mean.astype(dtype), (z_limit * std).astype(dtype)
+    
+    # Pass 2: one outlier mask per chunk
+    keep = np.concatenate([
+        rows_complete & (np.abs(df.iloc[rows, numeric_index].to_numpy(dtype=dtype) - mean) <= limit).all(axis=1)
+        for rows, rows_complete in zip(chunks, complete)
+    ]) if chunks else np.zeros(0, dtype=bool)
     
-    # Remove extreme outliers (beyond 3 standard deviations)
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    for column in numeric_columns:
-        mean = df[column].mean()
-        std = df[column].std()
-        df = df[abs(df[column] - mean) <= 3 * std]
+    # take() copies the kept rows once and, unlike boolean indexing, isn't flagged as a copy of df
+    result = df.take(np.flatnonzero(keep))
+    if not standardize:
+        return result
     
-    # Standardize features (V1-V28)
-    feature_columns = [f'V{i}' for i in range(1, 29)]
-    scaler = StandardScaler()
-    if all(col in df.columns for col in feature_columns):
-        df[feature_columns] = scaler.fit_transform(df[feature_columns])
+    if scaler is None:
+        scaler = StandardScaler()
+        for rows in chunks:
+            features = df.iloc[rows, feature_index].to_numpy(dtype=dtype)[keep[rows]]
+            if len(features):
+                scaler.partial_fit(features)
+        if not hasattr(scaler, 'mean_'):
+            return result
     
-    return df
+    # Pass 3: standardize the kept rows straight into one float array
+    scaled = np.empty((len(result), len(feature_columns)), dtype=dtype)
+    feature_mean, feature_scale = scaler.mean_.astype(dtype), scaler.scale_.astype(dtype)
+    offset = 0
+    for rows in chunks:
+        features = df.iloc[rows, feature_index].to_numpy(dtype=dtype)[keep[rows]]
+        np.divide(features - feature_mean, feature_scale, out=scaled[offset:offset + len(features)])
+        offset += len(features)
+    result[feature_columns] = scaled
+    return result
 
-def extract_top_features(model, feature_names, row_data):
+def extract_top_features(model, feature_names, row_data, top_k=TOP_CONTRIBUTORS, scaler=None):
     """
-    Extract top contributing features for a prediction
+    Extract top contributing features for a prediction, as
+    {'feature', 'contribution'} dicts with signed contributions ordered by
+    absolute value, largest first.
+
+    model is a ScoringEngine (bundle.engine), or a fitted linear model as
+    before. An engine, or a model passed with its scaler, explains the
+    unscaled row_data on the scaled inputs, exactly like predict_fraud().
+    A model without a scaler multiplies its coefficients with row_data as
+    given, which therefore has to be scaled already.
     """
-    # Get feature coefficients
-    coefficients = model.coef_[0]
-    
-    # Calculate feature contributions
-    contributions = []
-    for name, coef, value in zip(feature_names, coefficients, row_data):
-        contribution = coef * value
-        contributions.append({
-            'feature': name,
-            'contribution': float(contribution)
-        })
-    
-    # Sort by absolute contribution and get top features
-    return sorted(contributions, key=lambda x: abs(x['contribution']), reverse=True)[:5]
+    if isinstance(model, ScoringEngine):
+        contributions = model.contributions(np.atleast_2d(row_data))
+    elif scaler is not None:
+        contributions = ScoringEngine.from_sklearn(scaler, model).contributions(np.atleast_2d(row_data))
+    else:
+        contributions = np.asarray(row_data, dtype=np.float64) * model.coef_[0]
+    return top_contributions(contributions, feature_names, top_k)[0]
@@ -1,78 +1,196 @@
 import json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 import numpy as np
-from .ml_fraud_model import predict_fraud, load_model
+from .ml_fraud_model import ModelNotReady, get_model_bundle, predict_fraud, predict_fraud_batch
 from .models import Transaction
+from .executor import run_scoring
+from .batching import get_micro_batcher
+from .persistence import get_transaction_writer
+from .serialization import TRANSACTION_FIELDS, arow_chunks, astream_object, json_response, streaming_json_response
+from .timing import span, timing_stats
+from .caching import acached_json_response, atransactions_version, cached_json_response
+from .events import format_event, get_event_broker, publish_transactions
+from .rollups import GRANULARITIES, bucket_start
+from .models import PROBABILITY_BINS, TransactionRollup
+import asyncio
 import base64
 import hmac
 import hashlib
 import time
 from functools import wraps
+from datetime import timedelta
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import transaction as db_transaction
 from django.core.paginator import Paginator
+from django.db.models import Q
 import random
 from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+def check_api_key(request):
+    """Return an error response if the request lacks a valid API key"""
+    # For development, allow requests without API key
+    if settings.DEBUG:
+        return None
+        
+    api_key = request.headers.get('X-API-Key')
+    if not api_key:
+        return JsonResponse({
+            'error': 'API key is required',
+            'code': 'missing_api_key'
+        }, status=401)
+    
+    # In production, use a secure key management system
+    valid_api_key = 'your-test-api-key-123'  # Change this in production!
+    
+    if not hmac.compare_digest(api_key, valid_api_key):
+        return JsonResponse({
+            'error': 'Invalid API key',
+            'code': 'invalid_api_key'
+        }, status=401)
+    
+    return None
 
 def api_key_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapped_view(request, *args, **kwargs):
+            error_response = check_api_key(request)
+            if error_response is not None:
+                return error_response
+            return await view_func(request, *args, **kwargs)
+        return async_wrapped_view
+    
     @wraps(view_func)
     def wrapped_view(request, *args, **kwargs):
-        # For development, allow requests without API key
-        if settings.DEBUG:
-            return view_func(request, *args, **kwargs)
-            
-        api_key = request.headers.get('X-API-Key')
-        if not api_key:
-            return JsonResponse({
-                'error': 'API key is required',
-                'code': 'missing_api_key'
-            }, status=401)
-        
-        # In production, use a secure key management system
-        valid_api_key = 'your-test-api-key-123'  # Change this in production!
-        
-        if not hmac.compare_digest(api_key, valid_api_key):
-            return JsonResponse({
-                'error': 'Invalid API key',
-                'code': 'invalid_api_key'
-            }, status=401)
-        
+        error_response = check_api_key(request)
+        if error_response is not None:
+            return error_response
         return view_func(request, *args, **kwargs)
     return wrapped_view
 
+def model_not_ready_response(error):
+    """503 telling clients to retry while the model is being trained"""
+    response = JsonResponse({
+        'error': str(error),
+        'code': 'model_warming_up'
+    }, status=503)
+    response['Retry-After'] = str(settings.FRAUD_MODEL_RETRY_AFTER)
+    return response
+
+def explain_requested(request):
+    """Explanations are on by default and skipped with ?explain=0"""
+    return request.GET.get('explain', '1').lower() not in ('0', 'false', 'no')
+
+def transaction_from_prediction(features, prediction_result, timestamp):
+    """Build an unsaved Transaction for a scored feature dict"""
+    return Transaction(
+        timestamp=timestamp,
+        amount=prediction_result['transaction_amount'],
+        is_fraud=prediction_result['is_fraud'],
+        fraud_probability=prediction_result['fraud_probability'],
+        ml_features={k: float(v) for k, v in features.items() if k != 'Amount'}
+    )
+
 @csrf_exempt
 @api_key_required
 @require_http_methods(["POST"])
-def predict_fraud_view(request):
+async def predict_fraud_view(request):
     try:
         # Parse JSON data from request
-        data = json.loads(request.body)
+        with span('parse'):
+            data = json.loads(request.body)
         
-        # Make prediction
-        prediction_result = predict_fraud(data)
+        # Make prediction off the event loop, coalesced with concurrent requests if enabled
+        with span('predict'):
+            if settings.FRAUD_MICROBATCH_ENABLED:
+                prediction_result = await asyncio.wrap_future(
+                    get_micro_batcher().submit(data, explain=explain_requested(request))
+                )
+            else:
+                prediction_result = await run_scoring(predict_fraud, data, explain=explain_requested(request))
         
         # Add request timestamp
         prediction_result['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
         
-        # Save transaction to database
-        Transaction.objects.create(
-            amount=prediction_result['transaction_amount'],
-            is_fraud=prediction_result['is_fraud'],
-            fraud_probability=prediction_result['fraud_probability'],
-            features=data,
-            top_contributing_features=prediction_result['top_contributing_features']
-        )
+        # Save transaction to database (or hand it to the write-behind buffer)
+        with span('db'):
+            await get_transaction_writer().asave(
+                [transaction_from_prediction(data, prediction_result, timezone.now())]
+            )
         
         # Return prediction with enhanced information
-        return JsonResponse(prediction_result)
+        return json_response(prediction_result)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data',
+            'code': 'invalid_json'
+        }, status=400)
+    except ModelNotReady as e:
+        return model_not_ready_response(e)
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e),
+            'code': 'validation_error'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Prediction error: {str(e)}',
+            'code': 'internal_error'
+        }, status=500)
+
+@csrf_exempt
+@api_key_required
+@require_http_methods(["POST"])
+async def predict_fraud_batch_view(request):
+    """Score a batch of transactions in one request"""
+    try:
+        # Accept either {"transactions": [...]} or a bare list
+        with span('parse'):
+            data = json.loads(request.body)
+        transactions = data.get('transactions') if isinstance(data, dict) else data
+        
+        if not isinstance(transactions, list) or not transactions:
+            return JsonResponse({
+                'error': 'Expected a non-empty list of transactions',
+                'code': 'invalid_batch'
+            }, status=400)
+        if len(transactions) > settings.FRAUD_BATCH_MAX_SIZE:
+            return JsonResponse({
+                'error': f'Batch size {len(transactions)} exceeds limit of {settings.FRAUD_BATCH_MAX_SIZE}',
+                'code': 'batch_too_large'
+            }, status=413)
+        
+        # Score the whole batch in one pass
+        with span('predict'):
+            predictions = await run_scoring(predict_fraud_batch, transactions, explain=explain_requested(request))
+        
+        # Save all transactions with a single bulk insert
+        now = timezone.now()
+        with span('db'):
+            await get_transaction_writer().asave(
+                [transaction_from_prediction(features, result, now)
+                 for features, result in zip(transactions, predictions)]
+            )
+        
+        # Encode and send the predictions a chunk at a time
+        return streaming_json_response(astream_object(
+            {'count': len(predictions), 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')},
+            'predictions', predictions, chunk_size=settings.FRAUD_JSON_CHUNK_SIZE
+        ))
         
     except json.JSONDecodeError:
         return JsonResponse({
             'error': 'Invalid JSON data',
             'code': 'invalid_json'
         }, status=400)
+    except ModelNotReady as e:
+        return model_not_ready_response(e)
     except ValueError as e:
         return JsonResponse({
             'error': str(e),
@@ -90,54 +208,54 @@ def predict_fraud_view(request):
 def model_info(request):
     """Get information about the current model"""
     try:
-        _, _, metadata = load_model()
-        return JsonResponse({
-            'model_info': {
-                'training_date': metadata['training_date'],
-                'feature_count': len(metadata['feature_names']),
-                'top_features': [
-                    {'feature': k, 'importance': float(v)}
-                    for k, v in sorted(
-                        metadata['feature_importance'].items(),
-                        key=lambda x: abs(x[1]),
-                        reverse=True
-                    )[:10]
-                ]
-            }
-        })
+        bundle = get_model_bundle()
+        # The artifact signature changes whenever a new model is swapped in
+        return cached_json_response(request, bundle.signature, lambda: model_info_response(bundle.metadata))
+    except ModelNotReady as e:
+        return model_not_ready_response(e)
     except Exception as e:
         return JsonResponse({
             'error': f'Error fetching model info: {str(e)}',
             'code': 'model_info_error'
         }, status=500)
 
+def model_info_response(metadata):
+    return JsonResponse({
+        'model_info': {
+            'training_date': metadata['training_date'],
+            'feature_count': len(metadata['feature_names']),
+            'top_features': [
+                {'feature': k, 'importance': float(v)}
+                for k, v in sorted(
+                    metadata['feature_importance'].items(),
+                    key=lambda x: abs(x[1]),
+                    reverse=True
+                )[:10]
+            ]
+        }
+    })
+
 @csrf_exempt
 @api_key_required
 @require_http_methods(["GET"])
-def transactions_list(request):
-    """Get list of transactions with pagination"""
-    try:
-        # Get the latest 50 transactions, ordered by timestamp
-        transactions = Transaction.objects.all().order_by('-timestamp')[:50]
-        
-        return JsonResponse({
-            'transactions': [
-                {
-                    'id': t.id,
-                    'timestamp': t.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    'amount': float(t.amount),
-                    'is_fraud': t.is_fraud,
-                    'fraud_probability': float(t.fraud_probability),
-                    'top_contributing_features': t.top_contributing_features
-                }
-                for t in transactions
-            ]
-        })
-    except Exception as e:
-        return JsonResponse({
-            'error': f'Error fetching transactions: {str(e)}',
-            'code': 'transactions_error'
-        }, status=500)
+def internal_metrics(request):
+    """Internal serving metrics"""
+    writer = get_transaction_writer()
+    return JsonResponse({
+        'micro_batching': get_micro_batcher().stats() if settings.FRAUD_MICROBATCH_ENABLED else None,
+        'persistence': {
+            'mode': writer.mode,
+            'pending': writer.pending(),
+            'written': writer.written,
+            'failed': writer.failed
+        },
+        'events': {
+            'published': get_event_broker().published,
+            'subscribers': get_event_broker().subscriber_count()
+        },
+        # Per-view (and per-micro-batch) stage latency histograms
+        'timing': timing_stats() if settings.FRAUD_TIMING_ENABLED else None
+    })
 
 def generate_ml_features():
     """Generate mock ML features for demonstration purposes."""
@@ -158,31 +276,24 @@ def create_transaction(request):
                 'code': 'invalid_timestamp'
             }, status=400)
         
-        # Create transaction with user-provided fields
-        transaction = Transaction.objects.create(
-            timestamp=timestamp,
-            amount=float(data.get('amount', 0)),
-            location=data.get('location', ''),
-            description=data.get('description', ''),
-            ml_features=generate_ml_features()  # Auto-generate ML features
-        )
-        
-        # Simulate fraud detection (in production, this would use real ML)
-        is_fraud = random.random() < 0.1  # 10% chance of fraud
-        transaction.is_fraud = is_fraud
-        transaction.fraud_probability = random.random()
-        transaction.save()
+        with db_transaction.atomic():
+            # Create transaction with user-provided fields
+            transaction = Transaction.objects.create(
+                timestamp=timestamp,
+                amount=float(data.get('amount', 0)),
+                location=data.get('location', ''),
+                description=data.get('description', ''),
+                ml_features=generate_ml_features()  # Auto-generate ML features
+            )
+            
+            # Simulate fraud detection (in production, this would use real ML)
+            is_fraud = random.random() < 0.1  # 10% chance of fraud
+            transaction.is_fraud = is_fraud
+            transaction.fraud_probability = random.random()
+            transaction.save()
+            db_transaction.on_commit(lambda: publish_transactions('created', [transaction]))
         
-        return JsonResponse({
-            'id': transaction.id,
-            'timestamp': transaction.timestamp.isoformat(),
-            'amount': transaction.amount,
-            'location': transaction.location,
-            'description': transaction.description,
-            'is_fraud': transaction.is_fraud,
-            'fraud_probability': transaction.fraud_probability,
-            'created_at': transaction.created_at.isoformat()
-        }, status=201)
+        return JsonResponse(transaction.as_dict(), status=201)
         
     except Exception as e:
         return JsonResponse({
@@ -190,32 +301,138 @@ def create_transaction(request):
             'code': 'transaction_error'
         }, status=400)
 
+def encode_cursor(created_at, transaction_id):
+    """Opaque keyset cursor pointing just after (created_at, id) in (-created_at, -id) order"""
+    raw = json.dumps([created_at.isoformat(), transaction_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        created_at = None
+    if created_at is None or not isinstance(transaction_id, int):
+        raise ValueError('Invalid cursor')
+    return created_at, transaction_id
+
+def _float_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+
+def _datetime_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'{name} must be an ISO 8601 datetime')
+    # Values without an offset are taken in the server's time zone
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+def filter_transactions(queryset, params):
+    """
+    Apply the transaction list filters from query params.
+
+    is_fraud, min_probability/max_probability, min_amount/max_amount and
+    since/until (on the transaction timestamp, inclusive). Raises ValueError
+    for malformed values.
+    """
+    is_fraud = params.get('is_fraud')
+    if is_fraud not in (None, ''):
+        if is_fraud.lower() not in ('true', '1', 'false', '0'):
+            raise ValueError('is_fraud must be true or false')
+        queryset = queryset.filter(is_fraud=is_fraud.lower() in ('true', '1'))
+    
+    lookups = {
+        'fraud_probability__gte': _float_param(params, 'min_probability'),
+        'fraud_probability__lte': _float_param(params, 'max_probability'),
+        'amount__gte': _float_param(params, 'min_amount'),
+        'amount__lte': _float_param(params, 'max_amount'),
+        'timestamp__gte': _datetime_param(params, 'since'),
+        'timestamp__lte': _datetime_param(params, 'until'),
+    }
+    return queryset.filter(**{lookup: value for lookup, value in lookups.items() if value is not None})
+
 @csrf_exempt
 @require_http_methods(["GET"])
-def transactions_list(request):
+async def transactions_list(request):
+    """
+    Newest transactions first, paginated with a keyset cursor on (created_at, id).
+
+    Pass pagination.next_cursor back as ?cursor= to get the next page; each
+    page is a single index range scan, however deep it is. Pages are cached
+    until the next transaction write and carry an ETag for conditional GETs.
+    """
+    return await acached_json_response(request, await atransactions_version(), lambda: transactions_page(request))
+
+async def transactions_page(request):
     try:
-        transactions = Transaction.objects.all()[:100]  # Limit to last 100
-        return JsonResponse({
-            'transactions': [{
-                'id': t.id,
-                'timestamp': t.timestamp.isoformat(),
-                'amount': t.amount,
-                'location': t.location,
-                'description': t.description,
-                'is_fraud': t.is_fraud,
-                'fraud_probability': t.fraud_probability,
-                'created_at': t.created_at.isoformat()
-            } for t in transactions]
-        })
+        try:
+            limit = int(request.GET.get('limit', settings.FRAUD_TRANSACTIONS_PAGE_SIZE))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        limit = max(1, min(limit, settings.FRAUD_TRANSACTIONS_PAGE_MAX))
+        
+        # The list never returns feature vectors, so don't read them
+        queryset = filter_transactions(Transaction.objects.defer('feature_vector'), request.GET)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            created_at, transaction_id = decode_cursor(cursor)
+            # (created_at, id) < cursor, written so the database can seek on created_at
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=transaction_id))
+            )
+        
+        # Fetch one extra row to know whether another page exists, stream the rest
+        rows = queryset.order_by('-created_at', '-id')[:limit + 1]
+        returned, has_more, last_row = 0, False, None
+        
+        async def page_chunks():
+            nonlocal returned, has_more, last_row
+            async for chunk in arow_chunks(rows, TRANSACTION_FIELDS, settings.FRAUD_JSON_CHUNK_SIZE):
+                if returned + len(chunk) > limit:
+                    has_more = True
+                    chunk = chunk[:limit - returned]
+                if chunk:
+                    returned += len(chunk)
+                    last_row = chunk[-1]
+                yield chunk
+        
+        def pagination():
+            return {'pagination': {
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(last_row['created_at'], last_row['id']) if has_more else None
+            }}
+        
+        return streaming_json_response(
+            astream_object({}, 'transactions', page_chunks(), pagination, settings.FRAUD_JSON_CHUNK_SIZE)
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e),
+            'code': 'invalid_filter'
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'error': str(e),
             'code': 'transactions_error'
         }, status=500)
 
+def save_rescored_transaction(transaction):
+    with db_transaction.atomic():
+        transaction.save(update_fields=['is_fraud', 'fraud_probability'])
+        db_transaction.on_commit(lambda: publish_transactions('rescored', [transaction]))
+
 @csrf_exempt
 @require_http_methods(["POST"])
-def predict_transaction(request):
+async def predict_transaction(request):
     try:
         data = json.loads(request.body)
         transaction_id = data.get('transaction_id')
@@ -223,21 +440,136 @@ def predict_transaction(request):
         if not transaction_id:
             return JsonResponse({'message': 'transaction_id is required'}, status=400)
             
-        transaction = Transaction.objects.get(id=transaction_id)
+        with span('db'):
+            transaction = await Transaction.objects.aget(id=transaction_id)
         
         # Mock ML prediction (replace with actual ML model call)
-        is_fraud = random.random() < 0.1  # 10% chance of fraud
-        fraud_probability = random.random()
-        
-        transaction.is_fraud = is_fraud
-        transaction.fraud_probability = fraud_probability
-        transaction.save()
+        transaction.is_fraud = random.random() < 0.1  # 10% chance of fraud
+        transaction.fraud_probability = random.random()
+        with span('db'):
+            await sync_to_async(save_rescored_transaction)(transaction)
         
         return JsonResponse({
-            'is_fraud': is_fraud,
-            'fraud_probability': fraud_probability
+            'is_fraud': transaction.is_fraud,
+            'fraud_probability': transaction.fraud_probability
         })
     except Transaction.DoesNotExist:
         return JsonResponse({'message': 'Transaction not found'}, status=404)
     except Exception as e:
         return JsonResponse({'message': str(e)}, status=400)
+
+# How far back /api/stats/ looks when since is not given
+STATS_DEFAULT_WINDOWS = {'minute': timedelta(hours=1), 'hour': timedelta(days=1)}
+
+def rollup_summary(rollups):
+    """Counts, fraud rate, amounts and probability histogram summed over rollup rows"""
+    count = sum(r.count for r in rollups)
+    fraud_count = sum(r.fraud_count for r in rollups)
+    return {
+        'count': count,
+        'fraud_count': fraud_count,
+        'fraud_rate': fraud_count / count if count else 0.0,
+        'amount_sum': sum(r.amount_sum for r in rollups),
+        'fraud_amount_sum': sum(r.fraud_amount_sum for r in rollups),
+        'probability_histogram': [sum(bins) for bins in zip(*(r.probability_histogram for r in rollups))]
+            or [0] * PROBABILITY_BINS
+    }
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def fraud_stats(request):
+    """
+    Transaction counts, fraud rate, amounts and probability histogram per
+    minute or hour of transaction timestamp, served from the rollup table.
+
+    ?granularity=minute|hour (default hour), ?since= and ?until= (ISO 8601).
+    Buckets without transactions are left out.
+    """
+    try:
+        granularity = request.GET.get('granularity', 'hour')
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        until = _datetime_param(request.GET, 'until') or timezone.now()
+        since = _datetime_param(request.GET, 'since') or until - STATS_DEFAULT_WINDOWS[granularity]
+        if since > until:
+            raise ValueError('since must not be after until')
+        
+        step = timedelta(minutes=1) if granularity == 'minute' else timedelta(hours=1)
+        if (until - since) / step > settings.FRAUD_STATS_MAX_BUCKETS:
+            raise ValueError(
+                f'At most {settings.FRAUD_STATS_MAX_BUCKETS} {granularity} buckets can be requested at once'
+            )
+        
+        rollups = [r async for r in TransactionRollup.objects.filter(
+            granularity=granularity,
+            bucket_start__gte=bucket_start(since, granularity),
+            bucket_start__lte=until
+        ).order_by('bucket_start')]
+        
+        return JsonResponse({
+            'granularity': granularity,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'totals': rollup_summary(rollups),
+            'buckets': [
+                dict(rollup_summary([r]), bucket_start=r.bucket_start.isoformat())
+                for r in rollups
+            ]
+        })
+    except ValueError as e:
+        return JsonResponse({
+            'error': str(e),
+            'code': 'invalid_filter'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'error': str(e),
+            'code': 'stats_error'
+        }, status=500)
+
+@require_http_methods(["GET"])
+async def transaction_events(request):
+    """
+    Server-Sent Events stream of 'created' and 'rescored' transactions.
+
+    Each event's data is the transaction as returned by the list endpoint;
+    writes of more than FRAUD_EVENTS_MAX_PER_WRITE transactions arrive as
+    one 'batch_created' event with their count and ids instead.
+    Reconnecting clients resume after Last-Event-ID (or ?last_event_id=);
+    a 'reset' event means events were missed and the list should be
+    refetched. Comment lines are sent every FRAUD_EVENTS_HEARTBEAT seconds
+    to keep proxies from closing an idle stream.
+    """
+    last_event_id = request.GET.get('last_event_id') or request.headers.get('Last-Event-ID')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({
+            'error': 'last_event_id must be an integer',
+            'code': 'invalid_event_id'
+        }, status=400)
+    
+    broker = get_event_broker()
+    subscriber, backlog = broker.subscribe(last_event_id)
+    
+    async def stream():
+        try:
+            yield f"retry: {settings.FRAUD_EVENTS_RETRY_MS}\n\n"
+            for event in backlog:
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), settings.FRAUD_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:  # Fell behind, the client reconnects and catches up
+                    return
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscriber)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
@@ -0,0 +1,64 @@
+"""
+Compare the sklearn scoring path with the fused ScoringEngine.
+
+Run from the backend directory:
+    python -m benchmarks.bench_scoring
+"""
+import timeit
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from api.scoring import ScoringEngine
+
+N_FEATURES = 29
+
+def fit_synthetic_model(n_rows=5000, seed=0):
+    """Fit a scaler and logistic regression on random data shaped like creditcard.csv"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1, size=(n_rows, N_FEATURES))
+    X[:, -1] = rng.uniform(1, 500, n_rows)
+    y = (X[:, 3] - X[:, 13] + rng.normal(0, 1, n_rows) > 2).astype(int)
+    scaler = StandardScaler()
+    model = LogisticRegression(max_iter=1000, class_weight='balanced').fit(scaler.fit_transform(X), y)
+    return scaler, model, X
+
+def sklearn_score(scaler, model, features):
+    """The original predict_fraud path: transform, then predict and predict_proba"""
+    features_scaled = scaler.transform(features)
+    return model.predict_proba(features_scaled)[:, 1], model.predict(features_scaled)
+
+def best_of(func, number, repeat=5):
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+def main():
+    scaler, model, X = fit_synthetic_model()
+    engine64 = ScoringEngine.from_sklearn(scaler, model)
+    engine32 = engine64.astype(np.float32)
+
+    # Accuracy against sklearn
+    expected, expected_labels = sklearn_score(scaler, model, X)
+    for name, engine, tolerance in (('float64', engine64, 1e-9), ('float32', engine32, 1e-4)):
+        probabilities, labels = engine.score(X)
+        max_error = np.max(np.abs(probabilities - expected))
+        mismatches = int(np.sum(labels != expected_labels.astype(bool)))
+        status = 'ok' if max_error < tolerance else 'FAILED'
+        print(f"{name}: max |p - p_sklearn| = {max_error:.2e} ({status}), decision mismatches = {mismatches}")
+
+    # Latency
+    row = X[:1]
+    print("\nSingle row (us/call):")
+    print(f"  sklearn transform+predict+predict_proba  {best_of(lambda: sklearn_score(scaler, model, row), 2000):8.2f}")
+    print(f"  ScoringEngine float64                    {best_of(lambda: engine64.score(row), 20000):8.2f}")
+    print(f"  ScoringEngine float32                    {best_of(lambda: engine32.score(row), 20000):8.2f}")
+
+    print(f"\nBatch of {len(X)} rows (us/row):")
+    for name, func in (
+        ('sklearn transform+predict+predict_proba', lambda: sklearn_score(scaler, model, X)),
+        ('ScoringEngine float64', lambda: engine64.score(X)),
+        ('ScoringEngine float32', lambda: engine32.score(X)),
+    ):
+        print(f"  {name:<40} {best_of(func, 20) / len(X):8.4f}")
+
+if __name__ == '__main__':
+    main()
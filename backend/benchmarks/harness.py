@@ -0,0 +1,110 @@
+"""
+Timing, reporting and baseline comparison shared by the benchmark scripts.
+"""
+import gc
+import json
+import os
+import platform
+import time
+import numpy as np
+import pandas as pd
+from api.testing import FEATURE_NAMES
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+def sample_transactions(n, seed=0):
+    """n feature payloads like the ones clients POST"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0, 1, size=(n, len(FEATURE_NAMES)))
+    values[:, -1] = rng.uniform(1, 500, n).round(2)
+    return [dict(zip(FEATURE_NAMES, row)) for row in values.tolist()]
+
+def measure(func, iterations, warmup=None, rows=1):
+    """
+    Call func iterations times (after warmup calls) and summarize the latencies.
+
+    rows is how many items one call processes, for the throughput figure.
+    The garbage collector is paused while timing so a collection doesn't
+    land in a random iteration.
+    """
+    for _ in range(iterations // 10 + 1 if warmup is None else warmup):
+        func()
+
+    timings = np.empty(iterations)
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            start = time.perf_counter_ns()
+            func()
+            timings[i] = time.perf_counter_ns() - start
+    finally:
+        gc.enable()
+
+    timings /= 1e3  # microseconds
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        'iterations': iterations,
+        'rows': rows,
+        'mean_us': float(timings.mean()),
+        'p50_us': float(p50),
+        'p95_us': float(p95),
+        'p99_us': float(p99),
+        'throughput_rows_per_s': float(rows * iterations / (timings.sum() / 1e6)),
+    }
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def format_duration(us):
+    if us >= 1e6:
+        return f'{us / 1e6:.2f}s'
+    if us >= 1e3:
+        return f'{us / 1e3:.2f}ms'
+    return f'{us:.1f}us'
+
+def print_results(results):
+    print(f"{'benchmark':<32} {'p50':>10} {'p95':>10} {'p99':>10} {'rows/s':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<32} {format_duration(result['p50_us']):>10} {format_duration(result['p95_us']):>10} "
+            f"{format_duration(result['p99_us']):>10} {result['throughput_rows_per_s']:>12,.0f}"
+        )
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    List regressions: benchmarks whose p50 or p95 is more than tolerance
+    (as a fraction) slower than the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline['results'].get(name)
+        if expected is None:
+            continue
+        for stat in ('p50_us', 'p95_us'):
+            ratio = result[stat] / expected[stat] if expected[stat] else 1.0
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{name} {stat[:3]}: {format_duration(result[stat])} vs "
+                    f"{format_duration(expected[stat])} baseline ({ratio - 1:+.0%})"
+                )
+    return regressions
@@ -0,0 +1,194 @@
+"""
+Offline benchmark suite for the imports, scoring, validation, training and API paths.
+
+Everything runs against a model trained on synthetic data in a temporary
+directory and a throwaway test database, so no server, dataset or trained
+model is needed. Run from the backend directory:
+
+    python -m benchmarks.run                   # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline   # record this machine's baseline
+    python -m benchmarks.run --only predict --quick
+
+Exits with status 1 when a benchmark's p50 or p95 is more than --tolerance
+slower than the baseline. Baselines are machine specific: record them on
+the machine (or CI runner) that does the comparing.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fraud_detection_backend.settings')
+
+import django
+
+django.setup()
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from api import ml_fraud_model, ml_training, model_artifact
+from api.testing import write_synthetic_dataset
+from .harness import (
+    BASELINE_PATH, compare, environment, load_baseline, measure, print_results, sample_transactions,
+    save_baseline
+)
+
+API_KEY = 'your-test-api-key-123'
+BATCH_SIZE = 1000
+
+class Suite:
+    """Collects results of the benchmarks whose name contains the --only filter"""
+
+    def __init__(self, scale=1, only=None):
+        self.scale = scale
+        self.only = only
+        self.results = {}
+
+    def run(self, name, func, iterations, **kwargs):
+        if self.only and self.only not in name:
+            return
+        self.results[name] = measure(func, max(iterations // self.scale, 3), **kwargs)
+
+def read_body(response):
+    """Body of a plain or streamed (sync or async) test client response"""
+    if not response.streaming:
+        return response.content
+    if response.is_async:
+        async def consume():
+            return b''.join([part async for part in response.streaming_content])
+        return async_to_sync(consume)()
+    return b''.join(response.streaming_content)
+
+def model_benchmarks(suite, workdir):
+    """validate_features, predict_fraud, load_model and train_fraud_model"""
+    data_path = os.path.join(workdir, 'creditcard.csv')
+    model_dir = os.path.join(workdir, 'models')
+    write_synthetic_dataset(data_path, n_rows=5000, fraud_rate=0.02)
+
+    def train():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ml_training.train_fraud_model(data_path=data_path, model_dir=model_dir)
+
+    train()
+    suite.run('train_fraud_model (5k rows)', train, 10, warmup=0, rows=5000)
+
+    model_cache = ml_fraud_model.ModelCache(model_dir, auto_train=False)
+    ml_fraud_model._model_cache = model_cache
+    feature_names = model_cache.get().metadata['feature_names']
+    single = sample_transactions(1)[0]
+    batch = sample_transactions(BATCH_SIZE)
+
+    suite.run('validate_features', lambda: ml_fraud_model.validate_features(single, feature_names), 20000)
+    suite.run('predict_fraud', lambda: ml_fraud_model.predict_fraud(single), 5000)
+    suite.run('predict_fraud (explain=False)', lambda: ml_fraud_model.predict_fraud(single, explain=False), 5000)
+    suite.run(
+        f'predict_fraud_batch ({BATCH_SIZE})', lambda: ml_fraud_model.predict_fraud_batch(batch), 200,
+        rows=BATCH_SIZE
+    )
+    suite.run('load_model (cold)', lambda: ml_fraud_model.ModelCache(model_dir, auto_train=False).get(), 100)
+    pickles_dir = shutil.copytree(model_dir, os.path.join(workdir, 'pickles'))
+    for path in model_artifact.artifact_files(pickles_dir):
+        os.remove(path)
+    suite.run('load_model (cold, pickles)', lambda: ml_fraud_model.ModelCache(pickles_dir, auto_train=False).get(), 100)
+    suite.run('load_model (warm)', ml_fraud_model.load_model, 20000)
+
+def import_benchmarks(suite):
+    """Cold-start cost of the serving and training imports, each in a fresh interpreter"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='fraud_detection_backend.settings')
+
+    def python(code):
+        subprocess.run([sys.executable, '-c', code], cwd=backend_dir, env=env, check=True)
+
+    suite.run('python startup', lambda: python('pass'), 20, warmup=1)
+    suite.run('import serving path', lambda: python('import django; django.setup(); import fraud_detection_backend.urls'),
+              20, warmup=1)
+    suite.run('import training path', lambda: python('import django; django.setup(); import api.ml_training'),
+              20, warmup=1)
+
+def view_benchmarks(suite):
+    """The API views through the Django test client, against a test database"""
+    client = Client(HTTP_X_API_KEY=API_KEY)
+    single = json.dumps(sample_transactions(1)[0])
+    batch = json.dumps({'transactions': sample_transactions(BATCH_SIZE)})
+
+    def request(method, url, body=None, clear_cache=False):
+        if clear_cache:
+            cache.clear()
+        if method == 'post':
+            response = client.post(url, data=body, content_type='application/json')
+        else:
+            response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        return read_body(response)
+
+    suite.run('POST /api/predict/fraud/', lambda: request('post', reverse('predict_fraud'), single), 1000)
+    suite.run(
+        f'POST /api/predict/batch/ ({BATCH_SIZE})', lambda: request('post', reverse('predict_fraud_batch'), batch), 50,
+        rows=BATCH_SIZE
+    )
+    # By now the predictions above have filled the first page
+    suite.run('GET /api/transactions/', lambda: request('get', reverse('transactions_list'), clear_cache=True), 500,
+              rows=100)
+    suite.run('GET /api/transactions/ (cached)', lambda: request('get', reverse('transactions_list')), 2000, rows=100)
+    suite.run('GET /api/model-info/ (cached)', lambda: request('get', reverse('model_info')), 2000)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='10x fewer iterations')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before failing, e.g. 0.25')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+    suite = Suite(scale=10 if args.quick else 1, only=args.only)
+
+    workdir = tempfile.mkdtemp(prefix='fraud-bench-')
+    setup_test_environment()
+    old_databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        import_benchmarks(suite)
+        model_benchmarks(suite, workdir)
+        view_benchmarks(suite)
+    finally:
+        teardown_databases(old_databases, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = suite.results
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    if baseline.get('environment') != environment():
+        print("\nWarning: the baseline was recorded with a different environment:", baseline.get('environment'))
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions (more than {args.tolerance:.0%} slower than baseline):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
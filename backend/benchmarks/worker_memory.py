@@ -0,0 +1,146 @@
+"""
+Private memory of one forked API worker, the numbers in README.md's table.
+
+Emulates gunicorn's pre-forking master without needing gunicorn. For each
+model format (consolidated artifact, pickles only) and each mode, a fresh
+master process forks one worker that scores --rows transactions through
+predict_fraud and reports its private memory (Private_Clean + Private_Dirty
+from /proc/self/smaps_rollup, so Linux only):
+
+    lazy       the worker sets up Django and loads the model itself
+               (preload_app = False)
+    preload    the master imports the URLconf and loads the model first
+    freeze     as preload, then gc.collect() and gc.freeze(), which is
+               what gunicorn.conf.py does
+
+Run from the backend directory:
+
+    python -m benchmarks.worker_memory
+    python -m benchmarks.worker_memory --rows 5000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fraud_detection_backend.settings')
+
+MODES = ('lazy', 'preload', 'freeze')
+
+def load_app(model_dir):
+    """What gunicorn.conf.py's load_shared_state does, against model_dir"""
+    import django
+
+    django.setup()
+    from django.urls import get_resolver
+    from api import ml_fraud_model
+
+    get_resolver().url_patterns
+    ml_fraud_model._model_cache = ml_fraud_model.ModelCache(model_dir, auto_train=False)
+    return ml_fraud_model, ml_fraud_model.preload_model()
+
+def private_memory_kb():
+    """Private_Clean + Private_Dirty of this process"""
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total
+
+def score_transactions(ml_fraud_model, bundle, rows):
+    """Score rows single-transaction payloads, like rows POSTs to /api/predict/fraud/"""
+    import numpy as np
+
+    feature_names = bundle.metadata['feature_names']
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, size=(rows, len(feature_names)))
+    values[:, feature_names.index('Amount')] = rng.uniform(1, 500, rows).round(2)
+    for row in values.tolist():
+        ml_fraud_model.predict_fraud(dict(zip(feature_names, row)))
+
+def master(mode, model_dir, rows):
+    """Prepare this process as a gunicorn master would, fork one worker and return its private memory in kB"""
+    if mode != 'lazy':
+        loaded = load_app(model_dir)
+        if mode == 'freeze':
+            gc.collect()
+            gc.freeze()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        ml_fraud_model, bundle = load_app(model_dir) if mode == 'lazy' else loaded
+        score_transactions(ml_fraud_model, bundle, rows)
+        os.write(write_fd, str(private_memory_kb()).encode())
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result = f.read()
+    _, status = os.waitpid(pid, 0)
+    if status != 0 or not result:
+        raise RuntimeError(f'{mode} worker failed with status {status}')
+    return int(result)
+
+def train_models(workdir):
+    """A model trained on synthetic data, and a copy of it with only the pickles"""
+    import django
+
+    django.setup()
+    from api import ml_training, model_artifact
+    from api.testing import write_synthetic_dataset
+
+    data_path = os.path.join(workdir, 'creditcard.csv')
+    model_dir = os.path.join(workdir, 'models')
+    write_synthetic_dataset(data_path, n_rows=5000, fraud_rate=0.02)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ml_training.train_fraud_model(data_path=data_path, model_dir=model_dir)
+    pickles_dir = shutil.copytree(model_dir, os.path.join(workdir, 'pickles'))
+    for path in model_artifact.artifact_files(pickles_dir):
+        os.remove(path)
+    return {'Consolidated artifact': model_dir, 'Pickles only (loads sklearn)': pickles_dir}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure a forked worker's private memory")
+    parser.add_argument('--rows', type=int, default=20000, help='Transactions each worker scores')
+    parser.add_argument('--master', nargs=2, metavar=('MODE', 'MODEL_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.master:
+        mode, model_dir = args.master
+        print(master(mode, model_dir, args.rows))
+        return 0
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print('Needs Linux (/proc/self/smaps_rollup)', file=sys.stderr)
+        return 1
+
+    # Each master runs in a fresh interpreter so nothing measured here leaks into it
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix='fraud-memory-')
+    try:
+        print(f'Private memory of one worker after scoring {args.rows:,} transactions\n')
+        print(f"{'Model files':<30}" + ''.join(f'{mode:>12}' for mode in MODES))
+        for label, model_dir in train_models(workdir).items():
+            sizes = []
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.worker_memory', '--rows', str(args.rows),
+                     '--master', mode, model_dir],
+                    cwd=backend_dir, check=True, capture_output=True, text=True
+                ).stdout
+                sizes.append(int(output.split()[-1]) / 1024)
+            print(f'{label:<30}' + ''.join(f'{size:>9.0f} MB' for size in sizes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
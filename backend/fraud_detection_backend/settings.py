@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # This must be first
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,6 +122,60 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Fraud model serving
+FRAUD_BATCH_MAX_SIZE = 10000  # Max transactions per /api/predict/batch/ request
+FRAUD_MODEL_RETRY_AFTER = 30  # Retry-After seconds sent while the model is being trained
+FRAUD_SCORING_POOL = 'thread'  # 'thread' or 'process' pool used by the async views for scoring
+FRAUD_SCORING_WORKERS = 4
+
+# Coalesce concurrent single predictions into one scoring call: a batch closes
+# at MAX_SIZE rows or MAX_LATENCY_US after its first row, whichever comes first
+FRAUD_MICROBATCH_ENABLED = True
+FRAUD_MICROBATCH_MAX_SIZE = 64
+FRAUD_MICROBATCH_MAX_LATENCY_US = 500
+
+# How scored transactions are saved: 'sync' inserts before responding,
+# 'buffered' responds first and bulk-inserts in the background every
+# BATCH_SIZE rows or FLUSH_INTERVAL seconds (rows may be lost on a crash)
+FRAUD_PERSISTENCE_MODE = 'sync'
+FRAUD_PERSISTENCE_BATCH_SIZE = 500
+FRAUD_PERSISTENCE_FLUSH_INTERVAL = 1.0
+FRAUD_PERSISTENCE_MAX_PENDING = 50000
+
+# /api/transactions/ page size (?limit= is capped at PAGE_MAX)
+FRAUD_TRANSACTIONS_PAGE_SIZE = 100
+FRAUD_TRANSACTIONS_PAGE_MAX = 500
+
+# /api/stats/ reads pre-aggregated per-minute/per-hour rollups (manage.py rebuild_rollups recomputes them)
+FRAUD_STATS_MAX_BUCKETS = 1440
+
+# Versioned caching of /api/transactions/ and /api/model-info/ responses (see api/caching.py).
+# LocMemCache is per process: before running several workers (GUNICORN_WORKERS) switch to a shared
+# backend, e.g. django.core.cache.backends.redis.RedisCache or .db.DatabaseCache (manage.py createcachetable).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fraud-responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+FRAUD_RESPONSE_CACHE_TIMEOUT = 300
+
+# Rows fetched from the database and encoded per chunk by streamed JSON responses
+FRAUD_JSON_CHUNK_SIZE = 500
+
+# Per-stage request timing: Server-Timing headers and histograms in /api/internal/metrics/
+FRAUD_TIMING_ENABLED = True
+
+# /api/transactions/events/ Server-Sent Events feed
+FRAUD_EVENTS_BUFFER_SIZE = 1000  # Recent events kept for clients resuming with Last-Event-ID
+FRAUD_EVENTS_HEARTBEAT = 15  # Seconds between keep-alive comments
+FRAUD_EVENTS_RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
+FRAUD_EVENTS_MAX_PER_WRITE = 100  # Larger writes (e.g. batch predictions) publish one 'batch_created' event
+
+# Batch predictions carry ~1KB of JSON per transaction
+DATA_UPLOAD_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+
 # Static files configuration
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
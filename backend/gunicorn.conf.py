@@ -0,0 +1,74 @@
+"""
+Gunicorn configuration for the API, served through ASGI by uvicorn workers:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is preloaded in the master and the model is loaded there once
+(when_ready), then the master's heap is frozen with gc.freeze() so the
+garbage collector never writes to it. Forked workers share those pages
+copy-on-write instead of each importing the app and loading its own model.
+
+After retraining, send SIGHUP to the master (kill -HUP <pid>): on_reload
+loads the new model in the master before gunicorn replaces the workers, so
+the new workers, and any recycled later through max_requests, fork with it.
+Workers also pick up new artifacts on their own (ModelCache watches the
+files), but then each holds a private copy until the next SIGHUP.
+
+Runs one worker unless GUNICORN_WORKERS says otherwise, so by default the
+copy-on-write sharing above saves nothing; it pays off only with several
+workers, a setup the test suite doesn't cover (python -m
+benchmarks.worker_memory measures the per-worker saving). Before raising it:
+- the response cache and its version token live in CACHES; with the
+  default per-process LocMemCache a write in one worker doesn't invalidate
+  the others' cached /api/transactions/ pages and ETags, so they serve
+  stale data for up to FRAUD_RESPONSE_CACHE_TIMEOUT. Configure a shared
+  backend (Redis, Memcached or the database cache) first.
+- the Server-Sent Events broker is per process: clients of
+  /api/transactions/events/ only see writes made by their own worker.
+"""
+import gc
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fraud_detection_backend.settings')
+
+wsgi_app = 'fraud_detection_backend.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+preload_app = True
+
+# Recycle workers now and then; they fork from the master and share its model again
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+timeout = 30
+graceful_timeout = 30
+
+def load_shared_state(server):
+    """Import the URLconf and load the model in the master, then freeze the heap for the workers"""
+    from django.urls import get_resolver
+    from api.ml_fraud_model import preload_model
+
+    get_resolver().url_patterns
+    bundle = preload_model()
+    if bundle is None:
+        server.log.warning('No trained model yet, workers will load it once training finishes')
+    else:
+        server.log.info('Loaded model version %s for the workers', bundle.version)
+    gc.collect()
+    gc.freeze()
+
+def when_ready(server):
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith(('LocMemCache', 'DummyCache')):
+        server.log.warning(
+            'Running %s workers with the per-process %s: cached responses can be stale across '
+            'workers, configure a shared CACHES backend', server.cfg.workers, backend.rsplit('.', 1)[-1]
+        )
+    load_shared_state(server)
+
+def on_reload(server):
+    # Let the previous bundle be collected before loading the new one
+    gc.unfreeze()
+    load_shared_state(server)